@@ -21,12 +21,28 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # See https://docs.djangoproject.com/en/3.2/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-l6%2-kx%#9t2&xwwj3b9qc(=-1v#^cb7-+e$)-+#*54j1-9r-f'
+SECRET_KEY = os.environ.get(
+    'DJANGO_SECRET_KEY',
+    'django-insecure-l6%2-kx%#9t2&xwwj3b9qc(=-1v#^cb7-+e$)-+#*54j1-9r-f',
+)
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# docker-compose.yml sets DEBUG=1 for development, docker-compose-deploy.yml leaves it off
+DEBUG = bool(int(os.environ.get('DEBUG', 0)))
 
 ALLOWED_HOSTS = []
+ALLOWED_HOSTS.extend(
+    filter(
+        None,
+        os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(','),
+    )
+)
+
+if not DEBUG:
+    #running behind the proxy in docker-compose-deploy.yml, which sets X-Forwarded-Proto
+    SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
+    SESSION_COOKIE_SECURE = os.environ.get('DJANGO_SECURE_COOKIES', '0') == '1'
+    CSRF_COOKIE_SECURE = SESSION_COOKIE_SECURE
 
 
 # Application definition
@@ -38,6 +54,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'drf_spectacular',
@@ -47,13 +64,17 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.CompressionMiddleware',
+    'django.middleware.http.ConditionalGetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.ReadYourWritesMiddleware',
 ]
 
 ROOT_URLCONF = 'app.urls'
@@ -80,15 +101,127 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# core.db.backends.postgresql adds CONN_HEALTH_CHECKS and the optional in-process POOL.
+# DB_POOL_MAX_SIZE > 0 shares connections between a worker's threads (gthread); connections then go back to the pool
+# after each request instead of being kept per thread for DB_CONN_MAX_AGE seconds.
+# Behind pgbouncer in transaction mode leave the pool off and set DB_DISABLE_SERVER_SIDE_CURSORS=1.
+DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', 0))
+
 DATABASES = {
     'default': {
-        'ENGINE' : 'django.db.backends.postgresql',
+        'ENGINE' : 'core.db.backends.postgresql',
         'HOST' : os.environ.get('DB_HOST'),
+        'PORT' : os.environ.get('DB_PORT', ''),
         'NAME' : os.environ.get('DB_NAME'),
         'USER' : os.environ.get('DB_USER'),
         'PASSWORD' : os.environ.get('DB_PASS'),
+        'CONN_MAX_AGE' : int(os.environ.get('DB_CONN_MAX_AGE', 0 if DB_POOL_MAX_SIZE else 60)),
+        'CONN_HEALTH_CHECKS' : os.environ.get('DB_CONN_HEALTH_CHECKS', '1') == '1',
+        'DISABLE_SERVER_SIDE_CURSORS' : os.environ.get('DB_DISABLE_SERVER_SIDE_CURSORS', '0') == '1',
+        'POOL' : {
+            'MIN_SIZE' : int(os.environ.get('DB_POOL_MIN_SIZE', DB_POOL_MAX_SIZE)),
+            'MAX_SIZE' : DB_POOL_MAX_SIZE,
+            'TIMEOUT' : int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        },
+    }
+}
+
+#Optional read replica (core/db/routers.py): GET requests to the recipe APIs read from it, except for users who
+#wrote something in the last REPLICA_PIN_SECONDS. Uses the primary's settings unless overridden.
+if os.environ.get('DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST' : os.environ.get('DB_REPLICA_HOST'),
+        'PORT' : os.environ.get('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        'NAME' : os.environ.get('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'USER' : os.environ.get('DB_REPLICA_USER', DATABASES['default']['USER']),
+        'PASSWORD' : os.environ.get('DB_REPLICA_PASS', DATABASES['default']['PASSWORD']),
+        'TEST' : {'MIRROR': 'default'},
+    }
+
+REPLICA_DATABASES = [alias for alias in DATABASES if alias != 'default']
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 10))
+#Cache holding those pins. The write and the next read can land on different workers, so it must be shared
+#between processes (core/checks.py refuses a per-process one when a replica is configured)
+REPLICA_PIN_CACHE_ALIAS = 'default'
+DATABASE_ROUTERS = ['core.db.routers.ReplicaRouter']
+
+
+# Cache
+# locmem by default (tests/dev). It lives in one process, so with several gunicorn workers anything that must be
+# seen by all of them (the list cache versions) needs a shared cache: docker-compose-deploy.yml runs Redis with
+# CACHE_BACKEND=django_redis.cache.RedisCache CACHE_LOCATION=redis://redis:6379/0
+
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
     }
 }
+#Backends that aren't shared between processes (core/checks.py refuses them where sharing matters)
+PROCESS_LOCAL_CACHE_BACKENDS = [
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+]
+
+#Per-user list response cache (recipe/cache.py), on by default only with a shared cache
+API_CACHE_ENABLED = os.environ.get(
+    'API_CACHE_ENABLED', '0' if CACHE_BACKEND in PROCESS_LOCAL_CACHE_BACKENDS else '1',
+) == '1'
+API_CACHE_ALIAS = 'default'
+API_CACHE_TIMEOUT = int(os.environ.get('API_CACHE_TIMEOUT', 300))
+
+
+#In-process token -> user cache for user.authentication.CachedTokenAuthentication
+TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', 10000))
+TOKEN_CACHE_TTL = int(os.environ.get('TOKEN_CACHE_TTL', 60))
+#Cache telling every worker which users' tokens were deleted or changed, checked on each hit of the cache above.
+#Only revokes on all workers when shared between processes, with a per-process one (locmem) another worker can
+#still accept a deleted token for up to TOKEN_CACHE_TTL seconds.
+TOKEN_REVOCATION_CACHE_ALIAS = 'default'
+#API tokens (core.models.AuthToken) are valid for TOKEN_TTL seconds. Logging in returns the current token,
+#or a new one once it's within TOKEN_ROTATE_BEFORE seconds of expiring. `manage.py purge_tokens` deletes expired ones.
+TOKEN_TTL = int(os.environ.get('TOKEN_TTL', 7 * 24 * 3600))
+TOKEN_ROTATE_BEFORE = int(os.environ.get('TOKEN_ROTATE_BEFORE', 24 * 3600))
+
+#Per-request query/timing metrics (core/instrumentation.py): Server-Timing header and /metrics.
+#Set METRICS_TOKEN to require `Authorization: Bearer <token>` on /metrics.
+#Requests running at least INSTRUMENTATION_DUPLICATE_THRESHOLD repeated queries (N+1) are logged
+INSTRUMENTATION_ENABLED = os.environ.get('INSTRUMENTATION_ENABLED', '0') == '1'
+INSTRUMENTATION_DUPLICATE_THRESHOLD = int(os.environ.get('INSTRUMENTATION_DUPLICATE_THRESHOLD', 10))
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+#Response compression (core/middleware.py): gzip, or brotli when the `brotli` package is installed.
+#Bodies smaller than COMPRESSION_MIN_SIZE bytes aren't worth the CPU
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 4))
+
+
+#Password hashing (user/hashers.py). PASSWORD_HASHER picks the algorithm new passwords get: argon2 (default),
+#bcrypt (needs the `bcrypt` package) or pbkdf2. The others stay listed so existing hashes still verify,
+#and users are rehashed with the current algorithm and work factors on their next login.
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'argon2')
+PASSWORD_ARGON2_TIME_COST = int(os.environ.get('PASSWORD_ARGON2_TIME_COST', 2))
+PASSWORD_ARGON2_MEMORY_COST = int(os.environ.get('PASSWORD_ARGON2_MEMORY_COST', 19456)) #KiB
+PASSWORD_ARGON2_PARALLELISM = int(os.environ.get('PASSWORD_ARGON2_PARALLELISM', 1))
+PASSWORD_BCRYPT_ROUNDS = int(os.environ.get('PASSWORD_BCRYPT_ROUNDS', 12))
+PASSWORD_PBKDF2_ITERATIONS = int(os.environ.get('PASSWORD_PBKDF2_ITERATIONS', 260000))
+#Most hashes running at once per process, the rest of the requests wait for a slot
+PASSWORD_HASH_CONCURRENCY = int(os.environ.get('PASSWORD_HASH_CONCURRENCY', os.cpu_count() or 1))
+#Under ASGI all sync views of a worker share one thread, so run login/signup (and their hashing) in a pool of
+#PASSWORD_HASH_CONCURRENCY threads instead of holding it up (user/hashers.py)
+PASSWORD_HASH_OFFLOAD = os.environ.get(
+    'PASSWORD_HASH_OFFLOAD', '1' if os.environ.get('SERVER_MODE') == 'asgi' else '0',
+) == '1'
+_PASSWORD_HASHERS = {
+    'argon2': 'user.hashers.Argon2PasswordHasher',
+    'bcrypt': 'user.hashers.BCryptSHA256PasswordHasher',
+    'pbkdf2': 'user.hashers.PBKDF2PasswordHasher',
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHERS.pop(PASSWORD_HASHER), *_PASSWORD_HASHERS.values()]
+#The test runner (core/test_runner.py) swaps in a cheap hasher, hashing would otherwise dominate the suite
+TEST_RUNNER = 'core.test_runner.TestRunner'
 
 
 # Password validation
@@ -133,6 +266,26 @@ MEDIA_URL = '/static/media/'
 STATIC_ROOT = '/vol/web/static'
 MEDIA_ROOT = '/vol/web/media'
 
+#Recipe image variants (recipe/images.py): sync, thread or queue (run `manage.py process_images`)
+IMAGE_PROCESSING_MODE = os.environ.get('IMAGE_PROCESSING_MODE', 'thread')
+IMAGE_PROCESSING_WORKERS = int(os.environ.get('IMAGE_PROCESSING_WORKERS', 2))
+IMAGE_VARIANT_QUALITY = int(os.environ.get('IMAGE_VARIANT_QUALITY', 80))
+#Images pending/processing for longer than this are taken to be lost (worker died or restarted mid-job):
+#processing workers may claim them again and `manage.py requeue_images` sends them back through processing
+IMAGE_PROCESSING_TIMEOUT = int(os.environ.get('IMAGE_PROCESSING_TIMEOUT', 600))
+
+#Upload limits: uploads over FILE_UPLOAD_MAX_MEMORY_SIZE are streamed to a temp file instead of memory,
+#anything over IMAGE_UPLOAD_MAX_SIZE bytes or IMAGE_MAX_PIXELS pixels is rejected before being decoded
+IMAGE_UPLOAD_MAX_SIZE = int(os.environ.get('IMAGE_UPLOAD_MAX_SIZE', 10 * 1024 * 1024))
+IMAGE_MAX_PIXELS = int(os.environ.get('IMAGE_MAX_PIXELS', 40_000_000))
+IMAGE_ALLOWED_FORMATS = ['JPEG', 'PNG', 'WEBP', 'GIF']
+FILE_UPLOAD_MAX_MEMORY_SIZE = 1024 * 1024
+FILE_UPLOAD_HANDLERS = [
+    'recipe.uploads.MaxSizeUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -145,8 +298,31 @@ AUTH_USER_MODEL = 'core.User'
 #tells rest framework to generate schema from class in drf_spectacular
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS' : 'drf_spectacular.openapi.AutoSchema',
+    #orjson when installed, stdlib json otherwise (core/renderers.py, core/parsers.py)
+    'DEFAULT_RENDERER_CLASSES' : [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES' : [
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
+#Keyset pagination for list endpoints (recipe/pagination.py)
+API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', 50))
+API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', 500))
+#Recipe search (recipe/search.py): text search config and the most results returned for one search
+SEARCH_CONFIG = os.environ.get('SEARCH_CONFIG', 'english')
+SEARCH_MAX_RESULTS = int(os.environ.get('SEARCH_MAX_RESULTS', 100))
+#Render the recipe list from values() rows instead of RecipeSerializer (recipe/fast_list.py), same output
+RECIPE_FAST_LIST = os.environ.get('RECIPE_FAST_LIST', '1') == '1'
+#Rows validated and inserted per transaction by the bulk recipe import (recipe/importer.py)
+IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', 500))
+#Longest id list accepted by the ?tags= / ?ingredients= filters (recipe/filters.py)
+API_MAX_FILTER_IDS = int(os.environ.get('API_MAX_FILTER_IDS', 100))
+
 SPECTACULAR_SETTINGS = {
     'COMPONENT_SPLIT_REQUEST' : True,
 }
\ No newline at end of file
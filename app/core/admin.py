@@ -44,4 +44,5 @@ class UserAdmin(BaseUserAdmin):
 admin.site.register(models.User, UserAdmin)
 admin.site.register(models.Recipe)
 admin.site.register(models.Tag)
-admin.site.register(models.Ingredient)
\ No newline at end of file
+admin.site.register(models.Ingredient)
+admin.site.register(models.AuthToken, list_display=['key', 'user', 'created', 'expires'], raw_id_fields=['user'])
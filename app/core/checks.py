@@ -0,0 +1,33 @@
+"""
+System checks for settings that only work with a cache shared by every worker process.
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+
+def is_shared_cache(alias):
+    return settings.CACHES[alias]['BACKEND'] not in settings.PROCESS_LOCAL_CACHE_BACKENDS
+
+
+@register(Tags.caches)
+def check_api_cache(app_configs, **kwargs):
+    #The per-user list versions must be seen by every worker, or a write on one leaves the others serving stale lists
+    if settings.API_CACHE_ENABLED and not is_shared_cache(settings.API_CACHE_ALIAS):
+        return [Error(
+            'API_CACHE_ENABLED needs a cache shared between processes.',
+            hint='Set CACHE_BACKEND/CACHE_LOCATION to a shared cache such as Redis, or API_CACHE_ENABLED=0.',
+            id='core.E001',
+        )]
+    return []
+
+
+@register(Tags.caches)
+def check_replica_pin_cache(app_configs, **kwargs):
+    #A write pins the user to the primary, a read on another worker has to see that pin
+    if settings.REPLICA_DATABASES and not is_shared_cache(settings.REPLICA_PIN_CACHE_ALIAS):
+        return [Error(
+            'REPLICA_DATABASES needs a cache shared between processes for the read-your-writes pins.',
+            hint='Set CACHE_BACKEND/CACHE_LOCATION to a shared cache such as Redis.',
+            id='core.E002',
+        )]
+    return []
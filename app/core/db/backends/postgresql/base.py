@@ -0,0 +1,172 @@
+"""
+PostgreSQL backend with connection health checks and an optional in-process connection pool.
+
+Extra DATABASES keys (see app/settings.py):
+  CONN_HEALTH_CHECKS - check a persistent connection still works before the first query of each request
+                       (backport of the Django 4.1 setting of the same name), and a pooled one when it's checked out
+  POOL               - {'MIN_SIZE': .., 'MAX_SIZE': .., 'TIMEOUT': ..} to share connections between the threads
+                       of a worker (gthread). Leave it unset behind an external pooler such as pgbouncer.
+"""
+import os
+import threading
+
+import psycopg2
+import psycopg2.extensions
+import psycopg2.extras
+from psycopg2.pool import ThreadedConnectionPool
+from django.db.backends.postgresql.base import DatabaseWrapper as PostgresDatabaseWrapper
+from django.db.backends.postgresql.creation import DatabaseCreation as PostgresDatabaseCreation
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    #ThreadedConnectionPool that waits up to `timeout` seconds for a free connection instead of failing straight away.
+    #psycopg2 keeps MIN_SIZE connections open and closes any extra ones (up to MAX_SIZE) when they're returned.
+
+    def __init__(self, min_size, max_size, timeout, conn_params):
+        self.pid = os.getpid()
+        self.max_size = max_size
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._pool = ThreadedConnectionPool(min_size, max_size, **conn_params)
+
+    def getconn(self, check=False):
+        #check: probe an idle connection before handing it out, the server may have closed it while it sat in the pool
+        if not self._slots.acquire(timeout=self.timeout):
+            raise psycopg2.OperationalError(
+                f'No database connection free after {self.timeout}s (pool size {self.max_size}).'
+            )
+        try:
+            conn = self._pool.getconn()
+            #at most max_size idle connections to throw away before psycopg2 opens a new one
+            for _ in range(self.max_size):
+                if not conn.closed and (not check or is_usable(conn)):
+                    break
+                self._pool.putconn(conn, close=True)
+                conn = self._pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+        return conn
+
+    def putconn(self, conn, close=False):
+        try:
+            close = close or bool(conn.closed)
+            if not close and conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    close = True
+            self._pool.putconn(conn, close=close)
+        finally:
+            self._slots.release()
+
+    def closeall(self):
+        self._pool.closeall()
+
+
+def is_usable(conn):
+    #DatabaseWrapper.is_usable for a raw connection, leaves it idle again
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            conn.rollback()
+    except psycopg2.Error:
+        return False
+    return True
+
+
+def get_pool(alias, conn_params, options):
+    key = (alias, repr(sorted(conn_params.items())))
+    with _pools_lock:
+        pool = _pools.get(key)
+        #a pool inherited from the parent process (e.g. gunicorn preload) shares its sockets, start a new one
+        if pool is None or pool.pid != os.getpid():
+            max_size = options['MAX_SIZE']
+            pool = ConnectionPool(
+                min(options.get('MIN_SIZE', max_size), max_size),
+                max_size,
+                options.get('TIMEOUT', 30),
+                conn_params,
+            )
+            _pools[key] = pool
+        return pool
+
+
+def close_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            if pool.pid == os.getpid():
+                pool.closeall()
+        _pools.clear()
+
+
+class DatabaseCreation(PostgresDatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        #pooled connections to the test database would block DROP DATABASE
+        close_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(PostgresDatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_enabled = self.settings_dict.get('CONN_HEALTH_CHECKS', False)
+        self.health_check_done = False
+        pool_options = self.settings_dict.get('POOL') or {}
+        self.pool_options = pool_options if pool_options.get('MAX_SIZE') else None
+        self.pool = None
+
+    def get_new_connection(self, conn_params):
+        if self.pool_options is None:
+            return super().get_new_connection(conn_params)
+
+        self.pool = get_pool(self.alias, conn_params, self.pool_options)
+        connection = self.pool.getconn(check=self.health_check_enabled)
+        #same per-connection setup as PostgresDatabaseWrapper.get_new_connection
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+        psycopg2.extras.register_default_jsonb(conn_or_curs=connection, loads=lambda x: x)
+        return connection
+
+    def connect(self):
+        super().connect()
+        #a brand new connection doesn't need checking, one from the pool was checked when it was handed out
+        self.health_check_done = True
+
+    def _close(self):
+        if self.pool is None or self.connection is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            #closed inside an atomic block Django keeps (and refuses to use) the connection, so don't share it either
+            self.pool.putconn(self.connection, close=self.in_atomic_block)
+
+    def close_if_health_check_failed(self):
+        #Runs once per request, before its first query: drop a connection the server has closed since it was last used
+        if self.connection is None or not self.health_check_enabled or self.health_check_done:
+            return
+        if not self.is_usable():
+            self.close()
+        self.health_check_done = True
+
+    def close_if_unusable_or_obsolete(self):
+        #called by Django at the start and end of every request
+        self.health_check_done = False
+        super().close_if_unusable_or_obsolete()
+
+    def _cursor(self, name=None):
+        self.close_if_health_check_failed()
+        return super()._cursor(name)
@@ -0,0 +1,77 @@
+"""
+Read replica routing.
+
+Reads go to the primary unless the current request opted in with `replica_reads()` (see
+recipe.replica.ReplicaReadMixin). Users who wrote recently are pinned to the primary for
+REPLICA_PIN_SECONDS so they always read their own writes, even if the replica lags behind. The pins are kept
+in the REPLICA_PIN_CACHE_ALIAS cache, which has to be shared by every worker process.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+#Alias reads are sent to for the current request, None for the primary. A ContextVar so it's per thread/task
+_read_alias = ContextVar('read_alias', default=None)
+
+
+def _pins():
+    return caches[settings.REPLICA_PIN_CACHE_ALIAS]
+
+def _pin_key(user_id):
+    return f'db-primary-pin:{user_id}'
+
+def pin_to_primary(user_id):
+    if settings.REPLICA_DATABASES:
+        _pins().set(_pin_key(user_id), True, settings.REPLICA_PIN_SECONDS)
+
+def is_pinned(user_id):
+    if not settings.REPLICA_DATABASES:
+        return False
+    return _pins().get(_pin_key(user_id)) is not None
+
+def start_replica_reads():
+    #Returns a token for stop_replica_reads(), or None when there's no replica configured
+    if not settings.REPLICA_DATABASES:
+        return None
+    return _read_alias.set(random.choice(settings.REPLICA_DATABASES)) #one replica for the whole request
+
+def stop_replica_reads(token):
+    if token is not None:
+        _read_alias.reset(token)
+
+def reset_replica_reads():
+    _read_alias.set(None)
+
+@contextmanager
+def replica_reads():
+    token = start_replica_reads()
+    try:
+        yield
+    finally:
+        stop_replica_reads(token)
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        #replicas hold the same rows as the primary
+        databases = {'default', *settings.REPLICA_DATABASES}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        #replicas get the schema from the primary through replication
+        if db in settings.REPLICA_DATABASES:
+            return False
+        return None
@@ -0,0 +1,210 @@
+"""
+Per-request query and timing instrumentation (INSTRUMENTATION_ENABLED).
+
+core.middleware.InstrumentationMiddleware starts a RequestMetrics for every request, records each SQL
+query through connection.execute_wrapper and timings from the `timed()` hooks (serializer data, save,
+render), then adds a Server-Timing header and folds the numbers into the process wide `registry`
+served by core.views.metrics in the Prometheus text format.
+With instrumentation off the middleware removes itself and `timed()` is a ContextVar lookup.
+"""
+import functools
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from rest_framework import serializers
+
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('request_metrics', default=None)
+
+#Request duration histogram buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class RequestMetrics:
+    #What one request spent its time on
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = Counter() #sql -> times run, params left out so N+1 patterns show up as duplicates
+        self.db_seconds = 0.0
+        self.timings = Counter() #hook name -> seconds
+        self._active = set()
+
+    @property
+    def query_count(self):
+        return sum(self.queries.values())
+
+    @property
+    def duplicate_count(self):
+        return self.query_count - len(self.queries)
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def record_query(self, execute, sql, params, many, context):
+        #connection.execute_wrapper() hook
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - start
+            self.queries[sql] += 1
+
+    def server_timing(self):
+        entries = [
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{self.query_count} queries, {self.duplicate_count} duplicate"',
+        ]
+        for name, seconds in sorted(self.timings.items()):
+            entries.append(f'{name};dur={seconds * 1000:.1f}')
+        entries.append(f'total;dur={self.elapsed() * 1000:.1f}')
+        return ', '.join(entries)
+
+
+def start_request():
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+def end_request(token):
+    _current.reset(token)
+
+def current():
+    return _current.get()
+
+
+@contextmanager
+def timed(name):
+    #Add the time spent in the block to the current request's `name` timing, nested blocks of the same name count once
+    metrics = _current.get()
+    if metrics is None or name in metrics._active:
+        yield
+        return
+
+    metrics._active.add(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.timings[name] += time.perf_counter() - start
+        metrics._active.discard(name)
+
+def timed_method(name):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class TimedListSerializer(serializers.ListSerializer):
+
+    @property
+    def data(self):
+        with timed('serialize'):
+            return super().data
+
+class TimedSerializerMixin:
+    #Time turning instances into primitives, use TimedListSerializer as Meta.list_serializer_class for many=True
+
+    @property
+    def data(self):
+        with timed('serialize'):
+            return super().data
+
+
+class MetricsRegistry:
+    #Totals per (view, method), for this process only: scrape every worker or run one worker per container
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, view, method, status_code, metrics):
+        duration = metrics.elapsed()
+        with self._lock:
+            series = self._series.setdefault((view, method), {
+                'requests': Counter(),
+                'buckets': [0] * len(BUCKETS),
+                'duration': 0.0,
+                'queries': 0,
+                'duplicates': 0,
+                'db': 0.0,
+                'timings': Counter(),
+            })
+            series['requests'][status_code] += 1
+            for i, bound in enumerate(BUCKETS):
+                if duration <= bound:
+                    series['buckets'][i] += 1
+            series['duration'] += duration
+            series['queries'] += metrics.query_count
+            series['duplicates'] += metrics.duplicate_count
+            series['db'] += metrics.db_seconds
+            series['timings'].update(metrics.timings)
+
+    def reset(self):
+        with self._lock:
+            self._series = {}
+
+    def render(self):
+        with self._lock:
+            series = {key: {**value, 'requests': Counter(value['requests']), 'timings': Counter(value['timings'])}
+                      for key, value in self._series.items()}
+
+        lines = [
+            '# HELP http_requests_total Requests handled, by view, method and status.',
+            '# TYPE http_requests_total counter',
+        ]
+        for (view, method), value in sorted(series.items()):
+            for status_code, count in sorted(value['requests'].items()):
+                lines.append(f'http_requests_total{{view="{view}",method="{method}",status="{status_code}"}} {count}')
+
+        lines += [
+            '# HELP http_request_duration_seconds Time to handle a request.',
+            '# TYPE http_request_duration_seconds histogram',
+        ]
+        for (view, method), value in sorted(series.items()):
+            labels = f'view="{view}",method="{method}"'
+            for bound, count in zip(BUCKETS, value['buckets']):
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            total = sum(value['requests'].values())
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {total}')
+            lines.append(f'http_request_duration_seconds_sum{{{labels}}} {value["duration"]:.6f}')
+            lines.append(f'http_request_duration_seconds_count{{{labels}}} {total}')
+
+        for name, key, help_text in [
+            ('db_queries_total', 'queries', 'SQL queries run.'),
+            ('db_duplicate_queries_total', 'duplicates', 'SQL queries repeating an earlier query of the same request.'),
+            ('db_query_seconds_total', 'db', 'Time spent in SQL queries.'),
+        ]:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+            for (view, method), value in sorted(series.items()):
+                lines.append(f'{name}{{view="{view}",method="{method}"}} {value[key]}')
+
+        lines += [
+            '# HELP request_phase_seconds_total Time spent serializing, saving and rendering.',
+            '# TYPE request_phase_seconds_total counter',
+        ]
+        for (view, method), value in sorted(series.items()):
+            for phase, seconds in sorted(value['timings'].items()):
+                lines.append(f'request_phase_seconds_total{{view="{view}",method="{method}",phase="{phase}"}} {seconds:.6f}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def log_duplicates(request, metrics, threshold):
+    if metrics.duplicate_count < threshold:
+        return
+    sql, count = metrics.queries.most_common(1)[0]
+    logger.warning(
+        '%s %s ran %d duplicate queries, the most repeated (%d times): %s',
+        request.method, request.path, metrics.duplicate_count, count, sql,
+    )
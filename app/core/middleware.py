@@ -0,0 +1,137 @@
+"""
+Project wide middleware: instrumentation, response compression and read-your-writes pinning for the read replica.
+"""
+import asyncio
+import re
+from contextlib import ExitStack
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+from core import instrumentation
+from core.db.routers import pin_to_primary, reset_replica_reads
+
+try:
+    import brotli
+except ImportError: #optional dependency, gzip only without it
+    brotli = None
+
+
+re_accepts_br = re.compile(r'\bbr\b')
+
+#Only text-like bodies shrink, images/archives are already compressed
+COMPRESSIBLE_TYPES = (
+    'text/',
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'application/x-ndjson',
+    'application/vnd.oai.openapi',
+    'image/svg+xml',
+)
+
+
+class CompressionMiddleware(GZipMiddleware):
+    #GZipMiddleware plus brotli negotiation, a configurable size threshold and skipped media/static paths.
+    #Place it above ConditionalGetMiddleware so ETags are computed on (and 304s compared against) the uncompressed body.
+
+    def should_compress(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return False
+        if request.path.startswith((settings.MEDIA_URL, settings.STATIC_URL)):
+            return False
+        if not response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES):
+            return False
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return False
+        return True
+
+    def process_response(self, request, response):
+        if not self.should_compress(request, response):
+            return response
+
+        accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if brotli is None or response.streaming or not re_accepts_br.search(accept_encoding):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        compressed = brotli.compress(response.content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+
+        #the encoded body isn't byte-identical any more, so like GZipMiddleware weaken a strong ETag
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = 'br'
+        return response
+
+
+class ReadYourWritesMiddleware:
+    #After a successful write, send the user's reads to the primary for a while (core/db/routers.py).
+    #Also makes sure no request starts with replica reads left switched on by an earlier one in the same thread.
+    #Async capable, so under ASGI an async view below it (user.hashers.offload_hashing) isn't forced back into
+    #the worker's shared sync thread.
+
+    sync_capable = True
+    async_capable = True
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine #how Django 3.2 recognises async middleware
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        reset_replica_reads()
+        response = self.get_response(request)
+        self.pin_after_write(request, response)
+        return response
+
+    async def __acall__(self, request):
+        reset_replica_reads()
+        response = await self.get_response(request)
+        await sync_to_async(self.pin_after_write, thread_sensitive=True)(request, response) #request.user may hit the db
+        return response
+
+    def pin_after_write(self, request, response):
+        if settings.REPLICA_DATABASES and request.method not in self.SAFE_METHODS and response.status_code < 400:
+            user = getattr(request, 'user', None) #set by DRF authentication for API views
+            if user is not None and user.is_authenticated:
+                pin_to_primary(user.pk)
+
+
+class InstrumentationMiddleware:
+    #Query count, DB time, duplicate queries and serialize/save/render timings per request (core/instrumentation.py).
+    #Reported in a Server-Timing header and at /metrics. Put it first so `total` covers the other middleware too.
+    #Sync only: db connections are per thread, so under ASGI it keeps the whole request in one thread.
+
+    def __init__(self, get_response):
+        if not settings.INSTRUMENTATION_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics, token = instrumentation.start_request()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(metrics.record_query))
+                response = self.get_response(request)
+        finally:
+            instrumentation.end_request(token)
+
+        response['Server-Timing'] = metrics.server_timing()
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        instrumentation.registry.observe(view, request.method, response.status_code, metrics)
+        instrumentation.log_duplicates(request, metrics, settings.INSTRUMENTATION_DUPLICATE_THRESHOLD)
+        return response
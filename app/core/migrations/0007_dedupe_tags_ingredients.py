@@ -0,0 +1,49 @@
+# Merge duplicate (user, name) tags/ingredients before they are made unique.
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicates(apps, model_name, field_name):
+    Model = apps.get_model('core', model_name)
+    Recipe = apps.get_model('core', 'Recipe')
+    Through = Recipe._meta.get_field(field_name).remote_field.through
+    fk_name = f'{model_name.lower()}_id'
+
+    duplicates = (
+        Model.objects.values('user_id', 'name')
+        .annotate(keep_id=Min('id'), n=Count('id'))
+        .filter(n__gt=1)
+    )
+    for dup in duplicates:
+        extra_ids = list(
+            Model.objects.filter(user_id=dup['user_id'], name=dup['name'])
+            .exclude(id=dup['keep_id'])
+            .values_list('id', flat=True)
+        )
+        # Point recipes at the row we keep, without creating duplicate links
+        linked = set(Through.objects.filter(**{fk_name: dup['keep_id']}).values_list('recipe_id', flat=True))
+        moved = set(
+            Through.objects.filter(**{f'{fk_name}__in': extra_ids})
+            .exclude(recipe_id__in=linked)
+            .values_list('recipe_id', flat=True)
+        )
+        Through.objects.bulk_create([Through(recipe_id=r, **{fk_name: dup['keep_id']}) for r in moved])
+        Through.objects.filter(**{f'{fk_name}__in': extra_ids}).delete()
+        Model.objects.filter(id__in=extra_ids).delete()
+
+
+def dedupe(apps, schema_editor):
+    merge_duplicates(apps, 'Tag', 'tags')
+    merge_duplicates(apps, 'Ingredient', 'ingredients')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_recipe_image'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe, migrations.RunPython.noop),
+    ]
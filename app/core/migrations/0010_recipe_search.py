@@ -0,0 +1,52 @@
+# Generated by Django 3.2.15
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def backfill_search_vectors(apps, schema_editor):
+    #Same SQL and SEARCH_CONFIG as the vectors kept up to date by recipe.search, in id batches
+    from recipe.search import update_search_vectors
+
+    Recipe = apps.get_model('core', 'Recipe')
+    last_id = 0
+    while True:
+        ids = list(
+            Recipe.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:BACKFILL_BATCH_SIZE]
+        )
+        if not ids:
+            break
+        update_search_vectors(ids)
+        last_id = ids[-1]
+
+
+class Migration(migrations.Migration):
+    #each backfill batch commits on its own instead of one UPDATE of the whole table in one transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0009_recipe_image_processing'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_search_vectors, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='recipe_search_vector_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='recipe_title_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.2.15
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_ingredient_count(apps, schema_editor):
+    Recipe = apps.get_model('core', 'Recipe')
+    Through = Recipe._meta.get_field('ingredients').remote_field.through
+    count = (
+        Through.objects.filter(recipe_id=OuterRef('pk'))
+        .order_by().values('recipe_id').annotate(n=Count('id')).values('n')
+    )
+    Recipe.objects.update(ingredient_count=Coalesce(Subquery(count), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_recipe_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredient_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_ingredient_count, migrations.RunPython.noop),
+    ]
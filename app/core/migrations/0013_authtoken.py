@@ -0,0 +1,45 @@
+# Expiring API tokens. Existing rest_framework.authtoken tokens are copied over with a fresh expiry so
+# clients stay logged in, the authtoken_token table itself is no longer used.
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+import django.db.models.deletion
+
+
+def copy_tokens(apps, schema_editor):
+    Token = apps.get_model('authtoken', 'Token')
+    AuthToken = apps.get_model('core', 'AuthToken')
+    expires = timezone.now() + timedelta(seconds=settings.TOKEN_TTL)
+    AuthToken.objects.bulk_create(
+        [AuthToken(key=token.key, user_id=token.user_id, created=token.created, expires=expires)
+         for token in Token.objects.iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_recipe_time_price_indexes'),
+        ('authtoken', '0003_tokenproxy'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthToken',
+            fields=[
+                ('key', models.CharField(max_length=40, primary_key=True, serialize=False)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('expires', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='auth_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='authtoken',
+            index=models.Index(fields=['expires'], name='authtoken_expires_idx'),
+        ),
+        migrations.RunPython(copy_tokens, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,16 @@
 '''
 Database models.
 '''
+import binascii
 import uuid
 import os
+from datetime import timedelta
 
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import (AbstractBaseUser, BaseUserManager, PermissionsMixin)
 
 def recipe_image_file_path(instance, filename):
@@ -58,6 +63,17 @@ class User(AbstractBaseUser, PermissionsMixin):
 
 class Recipe(models.Model):
     #Recipe Object
+    IMAGE_PENDING = 'pending'
+    IMAGE_PROCESSING = 'processing'
+    IMAGE_READY = 'ready'
+    IMAGE_FAILED = 'failed'
+    IMAGE_STATUS_CHOICES = [
+        (IMAGE_PENDING, 'Pending'),
+        (IMAGE_PROCESSING, 'Processing'),
+        (IMAGE_READY, 'Ready'),
+        (IMAGE_FAILED, 'Failed'),
+    ]
+
     user = models.ForeignKey(settings.AUTH_USER_MODEL,
     on_delete=models.CASCADE,)
     title = models.CharField(max_length=255)
@@ -68,6 +84,29 @@ class Recipe(models.Model):
     tags = models.ManyToManyField('Tag')
     ingredients = models.ManyToManyField('Ingredient')
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    #resized copies made in the background (recipe/images.py), e.g. {'thumbnail': 'uploads/recipe/<uuid>_thumbnail.webp'}
+    image_status = models.CharField(max_length=20, choices=IMAGE_STATUS_CHOICES, blank=True)
+    image_variants = models.JSONField(default=dict, blank=True)
+    #when the image was last queued or claimed, so a job lost with its worker can be taken again
+    image_claimed_at = models.DateTimeField(null=True, blank=True, editable=False)
+    #number of ingredients, kept up to date by recipe/pantry.py for "what can I cook" ranking
+    ingredient_count = models.PositiveIntegerField(default=0, editable=False)
+    #title/description/tag/ingredient names, kept up to date by recipe/search.py
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            #every list is "WHERE user_id = x ORDER BY id DESC"
+            models.Index(fields=['user', '-id'], name='recipe_user_id_desc_idx'),
+            #range filters / ordering on time and price
+            models.Index(fields=['user', 'time_minutes', 'id'], name='recipe_user_time_idx'),
+            models.Index(fields=['user', 'price', 'id'], name='recipe_user_price_idx'),
+            #the image worker polls for pending images
+            models.Index(fields=['image_status'], name='recipe_image_status_idx'),
+            GinIndex(fields=['search_vector'], name='recipe_search_vector_idx'),
+            #typo tolerant title matching (pg_trgm)
+            GinIndex(fields=['title'], name='recipe_title_trgm_idx', opclasses=['gin_trgm_ops']),
+        ]
 
     def __str__(self):
         return self.title
@@ -77,6 +116,12 @@ class Tag(models.Model):
     on_delete=models.CASCADE,)
     name = models.CharField(max_length=255)
 
+    class Meta:
+        constraints = [
+            #also serves the (user, name) lookups and the per-user name ordering
+            models.UniqueConstraint(fields=['user', 'name'], name='unique_tag_name_per_user'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -85,5 +130,55 @@ class Ingredient(models.Model):
     on_delete=models.CASCADE,)
     name = models.CharField(max_length=255)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'name'], name='unique_ingredient_name_per_user'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+class AuthTokenManager(models.Manager):
+
+    def issue(self, user):
+        #Login: hand out the user's current token again, unless it expires within TOKEN_ROTATE_BEFORE seconds
+        now = timezone.now()
+        token = (self.filter(user=user, expires__gt=now + timedelta(seconds=settings.TOKEN_ROTATE_BEFORE))
+                 .order_by('-expires').first())
+        return token or self.create(user=user)
+
+    def rotate(self, token):
+        #A fresh token for the same user. The old one is refused right away by every worker sharing
+        #TOKEN_REVOCATION_CACHE_ALIAS, with a per-process cache others accept it for up to TOKEN_CACHE_TTL seconds.
+        new_token = self.create(user_id=token.user_id)
+        token.delete()
+        return new_token
+
+class AuthToken(models.Model):
+    #API token with an expiry (user/authentication.py). A user can hold several, e.g. during a rotation.
+    key = models.CharField(max_length=40, primary_key=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL,
+    related_name='auth_tokens', on_delete=models.CASCADE,)
+    created = models.DateTimeField(auto_now_add=True)
+    expires = models.DateTimeField()
+
+    objects = AuthTokenManager()
+
+    class Meta:
+        indexes = [
+            #the purge_tokens command deletes by expiry
+            models.Index(fields=['expires'], name='authtoken_expires_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self.key:
+            self.key = binascii.hexlify(os.urandom(20)).decode()
+        if not self.expires:
+            self.expires = timezone.now() + timedelta(seconds=settings.TOKEN_TTL)
+        return super().save(*args, **kwargs)
+
+    def is_expired(self):
+        return self.expires <= timezone.now()
+
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.key
@@ -0,0 +1,46 @@
+"""
+orjson backed JSON renderer, with the stdlib JSONRenderer as fallback.
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from core.instrumentation import timed
+
+try:
+    import orjson
+except ImportError: #optional dependency
+    orjson = None
+
+
+_encoder = JSONEncoder()
+
+def _default(obj):
+    #Types orjson doesn't handle (Decimal, lazy strings, querysets...) or that we want exactly like DRF (datetimes)
+    return _encoder.default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    #Same output as JSONRenderer for the compact, non-ASCII-escaped JSON the API returns.
+    #Indented (?format=api / Accept indent=) or ASCII-escaped output still goes through the stdlib.
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed('render'):
+            return self._render(data, accepted_media_type, renderer_context)
+
+    def _render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=_default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+            )
+        except orjson.JSONEncodeError: #e.g. ints wider than 64 bits
+            return super().render(data, accepted_media_type, renderer_context)
+
+        #like JSONRenderer, escape the two characters that are valid JSON but not valid JavaScript
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
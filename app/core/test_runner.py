@@ -0,0 +1,18 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    #Hash test passwords with MD5: the real hashers are slow on purpose and most tests create users.
+    #Tests of the hashers themselves override PASSWORD_HASHERS back.
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._fast_hashers = override_settings(
+            PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+        )
+        self._fast_hashers.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._fast_hashers.disable()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,112 @@
+import time
+from unittest.mock import patch
+
+from django.db import connections
+from django.test import SimpleTestCase
+
+from core.db.backends.postgresql.base import close_pools
+
+
+def new_connection(**settings):
+    #A second connection to the test database, outside of any test transaction
+    default = connections['default']
+    return default.__class__({**default.settings_dict, **settings}, alias='default')
+
+
+class HealthCheckTests(SimpleTestCase):
+    databases = {'default'}
+
+    def test_health_check_once_per_request(self):
+        conn = new_connection(CONN_HEALTH_CHECKS=True, CONN_MAX_AGE=None, POOL=None)
+        try:
+            conn.ensure_connection()
+            conn.close_if_unusable_or_obsolete() #a request starts
+
+            with patch.object(conn, 'is_usable', return_value=True) as is_usable:
+                conn.cursor().close()
+                conn.cursor().close()
+            is_usable.assert_called_once()
+        finally:
+            conn.close()
+
+    def test_broken_connection_replaced(self):
+        conn = new_connection(CONN_HEALTH_CHECKS=True, CONN_MAX_AGE=None, POOL=None)
+        try:
+            conn.ensure_connection()
+            old = conn.connection
+            conn.close_if_unusable_or_obsolete()
+
+            with patch.object(conn, 'is_usable', return_value=False):
+                with conn.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+
+            self.assertIsNot(conn.connection, old)
+            self.assertTrue(old.closed)
+        finally:
+            conn.close()
+
+
+class PoolTests(SimpleTestCase):
+    databases = {'default'}
+
+    def tearDown(self):
+        close_pools()
+
+    def test_connection_reused(self):
+        conn = new_connection(CONN_MAX_AGE=0, POOL={'MIN_SIZE': 1, 'MAX_SIZE': 2, 'TIMEOUT': 1})
+        conn.ensure_connection()
+        pid = conn.connection.get_backend_pid()
+        conn.close()
+
+        conn.ensure_connection()
+        self.assertEqual(conn.connection.get_backend_pid(), pid)
+        conn.close()
+
+    def test_open_transaction_rolled_back_when_returned(self):
+        conn = new_connection(CONN_MAX_AGE=0, POOL={'MIN_SIZE': 1, 'MAX_SIZE': 1, 'TIMEOUT': 1})
+        conn.ensure_connection()
+        conn.connection.autocommit = False
+        conn.connection.cursor().execute('SELECT 1')
+        raw = conn.connection
+        conn.close()
+
+        self.assertFalse(raw.closed)
+        self.assertEqual(raw.get_transaction_status(), 0) #TRANSACTION_STATUS_IDLE
+
+    def test_pool_exhausted(self):
+        options = {'MIN_SIZE': 1, 'MAX_SIZE': 1, 'TIMEOUT': 0.1}
+        first = new_connection(CONN_MAX_AGE=0, POOL=options)
+        second = new_connection(CONN_MAX_AGE=0, POOL=options)
+        first.ensure_connection()
+        try:
+            with self.assertRaises(Exception) as cm:
+                second.ensure_connection()
+            self.assertIn('No database connection free', str(cm.exception))
+        finally:
+            first.close()
+
+    def test_terminated_pooled_connection_replaced(self):
+        options = {'MIN_SIZE': 1, 'MAX_SIZE': 1, 'TIMEOUT': 1}
+        conn = new_connection(CONN_HEALTH_CHECKS=True, CONN_MAX_AGE=0, POOL=options)
+        conn.ensure_connection()
+        pid = conn.connection.get_backend_pid()
+        conn.close() #back to the pool
+
+        #the server drops the idle pooled connection
+        with connections['default'].cursor() as cursor:
+            cursor.execute('SELECT pg_terminate_backend(%s)', [pid])
+            for _ in range(50):
+                cursor.execute('SELECT 1 FROM pg_stat_activity WHERE pid = %s', [pid])
+                if cursor.fetchone() is None:
+                    break
+                time.sleep(0.02)
+
+        #the next request's first query runs on a working connection
+        conn.close_if_unusable_or_obsolete()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                self.assertEqual(cursor.fetchone(), (1,))
+            self.assertNotEqual(conn.connection.get_backend_pid(), pid)
+        finally:
+            conn.close()
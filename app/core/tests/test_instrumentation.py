@@ -0,0 +1,106 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.instrumentation import RequestMetrics, registry, timed, start_request, end_request
+from core.models import Recipe
+
+RECIPES_URL = reverse('recipe:recipe-list')
+METRICS_URL = reverse('metrics')
+
+
+class RequestMetricsTests(SimpleTestCase):
+
+    def test_duplicate_queries_counted(self):
+        metrics = RequestMetrics()
+
+        def execute(sql, params, many, context):
+            return None
+
+        for n in range(3):
+            metrics.record_query(execute, 'SELECT * FROM tag WHERE id = %s', [n], False, {})
+        metrics.record_query(execute, 'SELECT 1', None, False, {})
+
+        self.assertEqual(metrics.query_count, 4)
+        self.assertEqual(metrics.duplicate_count, 2)
+        self.assertIn('4 queries, 2 duplicate', metrics.server_timing())
+
+    def test_timed_nested_counts_once(self):
+        metrics, token = start_request()
+        try:
+            with timed('serialize'):
+                with timed('serialize'):
+                    pass
+        finally:
+            end_request(token)
+
+        self.assertEqual(list(metrics.timings), ['serialize'])
+
+    def test_timed_without_request(self):
+        with timed('serialize'):
+            pass
+
+
+@override_settings(INSTRUMENTATION_ENABLED=True, METRICS_TOKEN='')
+class InstrumentationMiddlewareTests(TestCase):
+
+    def setUp(self):
+        registry.reset()
+        self.user = get_user_model().objects.create_user('user@example.com', 'testpass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Recipe.objects.create(user=self.user, title='Sample', time_minutes=5, price=Decimal('5.50'))
+
+    def test_server_timing_header(self):
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        timing = res['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn('serialize;dur=', timing)
+        self.assertIn('render;dur=', timing)
+        self.assertIn('total;dur=', timing)
+
+    def test_save_timed(self):
+        res = self.client.post(RECIPES_URL, {'title': 'New', 'time_minutes': 5, 'price': '1.00'})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertIn('save;dur=', res['Server-Timing'])
+
+    def test_metrics_endpoint(self):
+        self.client.get(RECIPES_URL)
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        body = res.content.decode()
+        self.assertIn('http_requests_total{view="recipe:recipe-list",method="GET",status="200"} 1', body)
+        self.assertIn('db_queries_total{view="recipe:recipe-list",method="GET"}', body)
+        self.assertIn('request_phase_seconds_total{view="recipe:recipe-list",method="GET",phase="serialize"}', body)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_token_required(self):
+        res = self.client.get(METRICS_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        res = self.client.get(METRICS_URL, HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+@override_settings(INSTRUMENTATION_ENABLED=False)
+class InstrumentationDisabledTests(TestCase):
+
+    def test_no_header_or_metrics(self):
+        user = get_user_model().objects.create_user('user@example.com', 'testpass')
+        client = APIClient()
+        client.force_authenticate(user)
+
+        res = client.get(RECIPES_URL)
+        self.assertFalse(res.has_header('Server-Timing'))
+
+        res = client.get(METRICS_URL)
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
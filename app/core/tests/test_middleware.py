@@ -0,0 +1,66 @@
+import gzip
+from unittest import skipIf
+from unittest.mock import patch
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core import middleware
+from core.middleware import CompressionMiddleware
+
+BODY = b'{"title": "Sample recipe name", "time_minutes": 5}' * 100
+
+
+def get_response(content=BODY, content_type='application/json'):
+    def view(request):
+        response = HttpResponse(content, content_type=content_type)
+        response['ETag'] = '"abc"'
+        return response
+    return view
+
+
+@override_settings(COMPRESSION_MIN_SIZE=1024, COMPRESSION_BROTLI_QUALITY=4)
+class CompressionMiddlewareTests(SimpleTestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def request(self, path='/api/recipe/recipes/', accept='gzip', **kwargs):
+        request = self.factory.get(path, HTTP_ACCEPT_ENCODING=accept)
+        return CompressionMiddleware(get_response(**kwargs))(request)
+
+    @patch.object(middleware, 'brotli', None)
+    def test_gzip_large_json(self):
+        res = self.request(accept='gzip, deflate, br')
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(res.content), BODY)
+        self.assertEqual(res['ETag'], 'W/"abc"')
+        self.assertIn('Accept-Encoding', res['Vary'])
+
+    def test_small_response_not_compressed(self):
+        res = self.request(content=b'{"id": 1}')
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+        self.assertEqual(res['ETag'], '"abc"')
+
+    def test_no_accept_encoding_not_compressed(self):
+        res = self.request(accept='')
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+        self.assertEqual(res.content, BODY)
+
+    def test_media_and_images_not_compressed(self):
+        res = self.request(path='/static/media/uploads/recipe/a.json')
+        self.assertFalse(res.has_header('Content-Encoding'))
+
+        res = self.request(content_type='image/jpeg')
+        self.assertFalse(res.has_header('Content-Encoding'))
+
+    @skipIf(middleware.brotli is None, 'brotli is not installed')
+    def test_brotli_preferred(self):
+        res = self.request(accept='gzip, br')
+
+        self.assertEqual(res['Content-Encoding'], 'br')
+        self.assertEqual(middleware.brotli.decompress(res.content), BODY)
+        self.assertEqual(res['ETag'], 'W/"abc"')
@@ -7,6 +7,7 @@
 from unittest.mock import patch
 from django.test import TestCase
 from django.contrib.auth import get_user_model #Helper func from django
+from django.db import IntegrityError
 
 from decimal import Decimal
 from core import models
@@ -86,6 +87,22 @@ class ModelsTests(TestCase):
         )
         self.assertEqual(str(ingredient), ingredient.name)
 
+    def test_tag_name_unique_per_user(self):
+        user = create_user()
+        other_user = create_user(email='other@example.com')
+        models.Tag.objects.create(user=user, name='Tag1')
+        models.Tag.objects.create(user=other_user, name='Tag1') #fine, different user
+
+        with self.assertRaises(IntegrityError):
+            models.Tag.objects.create(user=user, name='Tag1')
+
+    def test_ingredient_name_unique_per_user(self):
+        user = create_user()
+        models.Ingredient.objects.create(user=user, name='Ingredient1')
+
+        with self.assertRaises(IntegrityError):
+            models.Ingredient.objects.create(user=user, name='Ingredient1')
+
     @patch('core.models.uuid.uuid4')
     def test_recipe_file_name_uuid(self, mock_uuid):
         #Testing generating image path
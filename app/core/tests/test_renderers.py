@@ -0,0 +1,78 @@
+import datetime
+import uuid
+from collections import OrderedDict
+from decimal import Decimal
+from io import BytesIO
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core import parsers, renderers
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+SAMPLE = OrderedDict([
+    ('id', 1),
+    ('title', 'Crème brûlée    '),
+    ('price', Decimal('5.50')),
+    ('time_minutes', 5),
+    ('ratio', 0.1),
+    ('created', datetime.datetime(2022, 9, 12, 15, 12, 1, 123456, tzinfo=timezone.utc)),
+    ('day', datetime.date(2022, 9, 12)),
+    ('uuid', uuid.UUID('12345678-1234-5678-1234-567812345678')),
+    ('tags', [OrderedDict([('id', 1), ('name', 'Thai')]), {'id': 2, 'name': None}]),
+    ('flags', {1: True, 'b': False}),
+])
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    #Output must match DRF's JSONRenderer
+
+    def test_same_output_as_json_renderer(self):
+        self.assertEqual(
+            FastJSONRenderer().render(SAMPLE),
+            JSONRenderer().render(SAMPLE),
+        )
+
+    def test_lists_and_empty_values(self):
+        for data in [[], {}, [SAMPLE, SAMPLE], None, 'text']:
+            self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_indent_uses_stdlib(self):
+        media_type = 'application/json; indent=4'
+        self.assertEqual(
+            FastJSONRenderer().render(SAMPLE, media_type),
+            JSONRenderer().render(SAMPLE, media_type),
+        )
+
+    def test_huge_int_falls_back(self):
+        data = {'n': 2 ** 70}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    @patch.object(renderers, 'orjson', None)
+    def test_without_orjson(self):
+        self.assertEqual(FastJSONRenderer().render(SAMPLE), JSONRenderer().render(SAMPLE))
+
+
+class FastJSONParserTests(SimpleTestCase):
+    #Parsed data must match DRF's JSONParser
+
+    def parse(self, parser, body):
+        return parser.parse(BytesIO(body), 'application/json', {'encoding': 'utf-8'})
+
+    def test_same_result_as_json_parser(self):
+        body = '{"title": "Crème brûlée", "price": "5.50", "tags": [{"name": "Thai"}], "n": 1.5}'.encode()
+        self.assertEqual(self.parse(FastJSONParser(), body), self.parse(JSONParser(), body))
+
+    def test_invalid_json_parse_error(self):
+        for body in [b'{"title": ', b'{"n": NaN}']:
+            with self.assertRaises(ParseError):
+                self.parse(FastJSONParser(), body)
+
+    @patch.object(parsers, 'orjson', None)
+    def test_without_orjson(self):
+        self.assertEqual(self.parse(FastJSONParser(), b'{"a": [1, 2]}'), {'a': [1, 2]})
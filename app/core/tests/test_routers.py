@@ -0,0 +1,138 @@
+import asyncio
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.checks import check_replica_pin_cache
+from core.db.routers import ReplicaRouter, is_pinned, pin_to_primary, replica_reads
+from core.middleware import ReadYourWritesMiddleware
+from core.models import Recipe
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+@override_settings(REPLICA_DATABASES=['replica'], REPLICA_PIN_SECONDS=10)
+class ReplicaRouterTests(SimpleTestCase):
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_reads_use_primary_by_default(self):
+        self.assertIsNone(self.router.db_for_read(Recipe))
+
+    def test_reads_use_replica_inside_replica_reads(self):
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Recipe), 'replica')
+            self.assertEqual(self.router.db_for_write(Recipe), 'default')
+        self.assertIsNone(self.router.db_for_read(Recipe))
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_no_replica_configured(self):
+        with replica_reads():
+            self.assertIsNone(self.router.db_for_read(Recipe))
+
+    def test_no_migrations_on_replica(self):
+        self.assertFalse(self.router.allow_migrate('replica', 'core'))
+        self.assertIsNone(self.router.allow_migrate('default', 'core'))
+
+    def test_pin_to_primary(self):
+        cache.delete('db-primary-pin:1')
+        self.assertFalse(is_pinned(1))
+
+        pin_to_primary(1)
+
+        self.assertTrue(is_pinned(1))
+        self.assertFalse(is_pinned(2))
+
+
+class ReplicaPinCacheCheckTests(SimpleTestCase):
+    #Pins must live in a cache every worker sees
+
+    @override_settings(REPLICA_DATABASES=['replica'])
+    def test_locmem_cache_rejected(self):
+        self.assertEqual([error.id for error in check_replica_pin_cache(None)], ['core.E002'])
+
+    @override_settings(REPLICA_DATABASES=['replica'], CACHES={'default': {'BACKEND': 'django_redis.cache.RedisCache'}})
+    def test_shared_cache_accepted(self):
+        self.assertEqual(check_replica_pin_cache(None), [])
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_no_replica_accepted(self):
+        self.assertEqual(check_replica_pin_cache(None), [])
+
+
+@override_settings(REPLICA_DATABASES=['replica'], REPLICA_PIN_SECONDS=10)
+class AsyncReadYourWritesMiddlewareTests(SimpleTestCase):
+    #Under ASGI the middleware stays async in front of the offloaded login/signup views
+
+    def test_async_write_pins_user(self):
+        cache.delete('db-primary-pin:7')
+
+        async def get_response(request):
+            return HttpResponse(status=201)
+
+        middleware = ReadYourWritesMiddleware(get_response)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        request = RequestFactory().post('/')
+        request.user = SimpleNamespace(pk=7, is_authenticated=True)
+
+        response = asyncio.run(middleware(request))
+
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(is_pinned(7))
+
+
+@override_settings(REPLICA_DATABASES=['replica'])
+class ReplicaReadTests(TransactionTestCase):
+    #Adds a 'replica' alias mirroring the test database: a second connection that sees the same committed rows
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        connections.databases['replica'] = {
+            **connections['default'].settings_dict,
+            'TEST': {**connections['default'].settings_dict['TEST'], 'MIRROR': 'default'},
+        }
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections.databases['replica']
+        del connections['replica']
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user('user@example.com', 'testpass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_reads_from_replica(self):
+        Recipe.objects.create(user=self.user, title='Sample', time_minutes=5, price=Decimal('5.50'))
+
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            res = self.client.get(RECIPES_URL, {'search': 'sample'}) #bypasses the list cache
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 1)
+        self.assertTrue(replica_queries.captured_queries)
+
+    def test_reads_after_write_use_primary(self):
+        res = self.client.post(RECIPES_URL, {'title': 'Sample', 'time_minutes': 5, 'price': '5.50'})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(res.data), 1)
+        self.assertFalse(replica_queries.captured_queries)
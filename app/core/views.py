@@ -1,3 +1,17 @@
-from django.shortcuts import render #noqa
+import hmac
 
-# Create your views here.
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+
+from core.instrumentation import registry
+
+
+def metrics(request):
+    #Prometheus scrape endpoint for the numbers collected by core.middleware.InstrumentationMiddleware
+    if not settings.INSTRUMENTATION_ENABLED:
+        raise Http404
+    if settings.METRICS_TOKEN:
+        expected = f'Bearer {settings.METRICS_TOKEN}'
+        if not hmac.compare_digest(request.META.get('HTTP_AUTHORIZATION', ''), expected):
+            return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
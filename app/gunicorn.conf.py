@@ -0,0 +1,84 @@
+"""
+Gunicorn configuration, picked up automatically when gunicorn is started from /app.
+
+SERVER_MODE selects how requests are served:
+  gthread - WSGI, a few processes with a thread pool each (default, good for our DB/IO bound views)
+  sync    - WSGI, one request at a time per process
+  asgi    - app.asgi through uvicorn workers
+
+Every setting can be overridden with a GUNICORN_* environment variable.
+`kill -HUP <master pid>` replaces the workers gracefully; because the app is preloaded in the master,
+deploying new code needs a full restart (or USR2 + WINCH/TERM of the old master).
+"""
+import multiprocessing
+import os
+
+
+def _env_int(name, default):
+    #unset and empty (e.g. `GUNICORN_WORKERS=` from docker-compose) both mean the default
+    return int(os.environ.get(name) or default)
+
+
+def _cpu_count():
+    #cores this container may actually use, not the host's total
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return multiprocessing.cpu_count()
+
+
+SERVER_MODE = os.environ.get('SERVER_MODE', 'gthread')
+if SERVER_MODE not in ('gthread', 'sync', 'asgi'):
+    raise RuntimeError(f'Unknown SERVER_MODE {SERVER_MODE!r}, use gthread, sync or asgi.')
+
+cores = _cpu_count()
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+if SERVER_MODE == 'asgi':
+    wsgi_app = 'app.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    #Django 3.2 runs our sync views in one thread per worker under ASGI, so scale with processes
+    default_workers = cores * 2 + 1
+    default_threads = 1
+elif SERVER_MODE == 'gthread':
+    wsgi_app = 'app.wsgi:application'
+    worker_class = 'gthread'
+    default_workers = cores + 1
+    default_threads = 4
+else:
+    wsgi_app = 'app.wsgi:application'
+    worker_class = 'sync'
+    default_workers = cores * 2 + 1
+    default_threads = 1
+
+workers = _env_int('GUNICORN_WORKERS', default_workers)
+threads = _env_int('GUNICORN_THREADS', default_threads)
+
+#Import Django and the whole project once in the master, workers share those pages copy-on-write
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+#Recycle workers now and then so slow leaks can't grow forever, jittered so they don't all restart together
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', 5000)
+max_requests_jitter = _env_int('GUNICORN_MAX_REQUESTS_JITTER', 500)
+
+timeout = _env_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = _env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = _env_int('GUNICORN_KEEPALIVE', 5)
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+#behind the proxy container, trust its X-Forwarded-* headers
+forwarded_allow_ips = os.environ.get('GUNICORN_FORWARDED_ALLOW_IPS', '*')
+
+
+def post_fork(server, worker):
+    #Nothing should have connected while preloading, but never share a DB socket or cache client between processes
+    if not preload_app:
+        return
+    from django.core.cache import close_caches
+    from django.db import connections
+    connections.close_all()
+    close_caches()
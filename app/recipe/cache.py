@@ -0,0 +1,85 @@
+import hashlib
+import json
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+
+#Every cached list for a user is keyed with that user's current "version".
+#Any write touching their recipes/tags/ingredients replaces the version, which orphans all of
+#their cached lists at once (old entries just expire) - no need to track individual keys.
+
+def _cache():
+    return caches[settings.API_CACHE_ALIAS]
+
+def _version_key(user_id):
+    return f'api-list-version:{user_id}'
+
+def get_user_version(user_id):
+    version = _cache().get(_version_key(user_id))
+    if version is None:
+        _cache().add(_version_key(user_id), uuid.uuid4().hex, None)
+        version = _cache().get(_version_key(user_id))
+    return version
+
+def invalidate_user(user_id):
+    #Bump now, and again on commit so a read racing the open transaction can't keep stale data cached
+    def bump():
+        _cache().set(_version_key(user_id), uuid.uuid4().hex, None)
+    bump()
+    transaction.on_commit(bump)
+
+def make_etag(data):
+    payload = json.dumps(data, sort_keys=True, default=str).encode()
+    return '"{}"'.format(hashlib.md5(payload).hexdigest())
+
+def etag_matches(request, etag):
+    #weak comparison (RFC 7232), so W/"..." sent back for a compressed response still matches
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return etag in [tag[2:] if tag.startswith('W/') else tag for tag in tags] or if_none_match.strip() == '*'
+
+def not_modified(etag):
+    response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    response['ETag'] = etag
+    return response
+
+
+class CachedListMixin:
+    #Cache the serialized list response per user and query string, and answer If-None-Match with 304
+
+    def _list_cache_key(self, request):
+        params = sorted(request.query_params.lists())
+        raw = f'{request.get_host()}{request.path}?{params}'
+        return 'api-list:{}:{}:{}'.format(
+            request.user.pk,
+            get_user_version(request.user.pk),
+            hashlib.md5(raw.encode()).hexdigest(),
+        )
+
+    def list(self, request, *args, **kwargs):
+        if not settings.API_CACHE_ENABLED:
+            return super().list(request, *args, **kwargs)
+
+        key = self._list_cache_key(request)
+        cached = _cache().get(key)
+        if cached is None:
+            response = super().list(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            link = response.get('Link') #next page of a list cut at API_MAX_PAGE_SIZE (recipe/pagination.py)
+            cached = (make_etag(response.data), response.data, link)
+            _cache().set(key, cached, settings.API_CACHE_TIMEOUT)
+
+        etag, data, link = cached
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        response = Response(data)
+        response['ETag'] = etag
+        if link is not None:
+            response['Link'] = link
+        return response
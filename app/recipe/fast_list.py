@@ -0,0 +1,68 @@
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+from rest_framework.response import Response
+from core.instrumentation import timed
+from core.models import Recipe
+from recipe.serializers import RecipeSerializer
+
+#Fast read path for the recipe list: builds the same output as RecipeSerializer(many=True) straight from
+#values() rows plus one (recipe_id, id, name) query per relation, skipping a serializer and two nested
+#serializers per recipe. Nested items are ordered by id, same as the prefetch the regular path uses.
+
+NESTED_FIELDS = [f.name for f in Recipe._meta.many_to_many]
+SCALAR_FIELDS = [f for f in RecipeSerializer.Meta.fields if f not in NESTED_FIELDS]
+
+
+def _related_map(field_name, recipe_ids):
+    #{recipe_id: [{'id': ..., 'name': ...}, ...]} for one relation
+    through = getattr(Recipe, field_name).through
+    fk_name = Recipe._meta.get_field(field_name).m2m_reverse_field_name() #tag / ingredient
+    rows = (
+        through.objects.filter(recipe_id__in=recipe_ids)
+        .order_by(f'{fk_name}_id')
+        .values_list('recipe_id', f'{fk_name}_id', f'{fk_name}__name')
+    )
+    related = defaultdict(list)
+    for recipe_id, related_id, name in rows:
+        related[recipe_id].append(OrderedDict([('id', related_id), ('name', name)]))
+    return related
+
+
+def serialize_recipe_list(rows):
+    #rows: dicts with SCALAR_FIELDS (e.g. a .values(*SCALAR_FIELDS) queryset or page)
+    rows = list(rows)
+    recipe_ids = [row['id'] for row in rows]
+    related = {field_name: _related_map(field_name, recipe_ids) for field_name in NESTED_FIELDS}
+
+    #the serializer's own fields format each scalar (e.g. price Decimal -> '5.50'), so output matches exactly
+    fields = RecipeSerializer().fields
+    scalar_fields = [(name, fields[name].to_representation) for name in SCALAR_FIELDS]
+
+    data = []
+    for row in rows:
+        item = {name: related[name].get(row['id'], []) for name in NESTED_FIELDS}
+        for name, to_representation in scalar_fields:
+            value = row[name]
+            item[name] = None if value is None else to_representation(value)
+        data.append(OrderedDict((name, item[name]) for name in RecipeSerializer.Meta.fields)) #same key order
+    return data
+
+
+class FastRecipeListMixin:
+    #list() via serialize_recipe_list when RECIPE_FAST_LIST is on; get_queryset must return values() rows then
+
+    def use_fast_list(self):
+        return settings.RECIPE_FAST_LIST and self.action == 'list'
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_fast_list():
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        with timed('serialize'):
+            data = serialize_recipe_list(page if page is not None else queryset)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
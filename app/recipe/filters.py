@@ -0,0 +1,106 @@
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+from rest_framework.exceptions import ValidationError
+from core.models import Recipe
+from recipe.search import search_recipes
+
+
+def params_to_ints(value, param):
+    #Turn '1,2,3' into [1, 2, 3]; bad, empty (',') or oversized lists are a 400, not a 500 / huge IN clause
+    try:
+        ids = {int(str_id) for str_id in value.split(',') if str_id.strip()}
+    except ValueError:
+        ids = None
+    if not ids:
+        raise ValidationError({param: 'Must be a comma separated list of ids.'})
+
+    if len(ids) > settings.API_MAX_FILTER_IDS:
+        raise ValidationError({param: f'At most {settings.API_MAX_FILTER_IDS} ids are allowed.'})
+    return sorted(ids)
+
+
+def _has_related(field_name, ids):
+    #EXISTS (SELECT 1 FROM core_recipe_<field> WHERE recipe_id = core_recipe.id AND <fk> IN ids)
+    #A semi-join: each recipe matches at most once, so no JOIN fan-out and no DISTINCT needed
+    through = getattr(Recipe, field_name).through
+    fk_name = Recipe._meta.get_field(field_name).m2m_reverse_name() #tag_id / ingredient_id
+    return Exists(through.objects.filter(
+        recipe_id=OuterRef('pk'), **{f'{fk_name}__in': ids}
+    ))
+
+
+def filter_related(queryset, params, field_name):
+    #?tags=1,2 matches recipes with any of the tags, ?tags=1,2&tags_match=all only recipes with every tag
+    value = params.get(field_name)
+    if not value:
+        return queryset
+
+    ids = params_to_ints(value, field_name)
+    match = params.get(f'{field_name}_match', 'any')
+    if match == 'any':
+        return queryset.filter(_has_related(field_name, ids))
+    if match == 'all':
+        for related_id in ids:
+            queryset = queryset.filter(_has_related(field_name, [related_id]))
+        return queryset
+    raise ValidationError({f'{field_name}_match': "Must be 'any' or 'all'."})
+
+
+def parse_price(value):
+    #Decimal also parses NaN and Infinity, which aren't prices
+    value = Decimal(value)
+    if not value.is_finite():
+        raise ValueError(value)
+    return value
+
+
+#?min_time=&max_time=, ?min_price=&max_price= -> field and how to parse the value
+RANGE_FILTERS = {
+    'time': ('time_minutes', int),
+    'price': ('price', parse_price),
+}
+
+#Allowed ?ordering= values; id is added as a tie breaker so the order (and cursor) is stable
+ORDERING_FIELDS = ['id', 'time_minutes', 'price']
+
+
+def filter_ranges(queryset, params):
+    for name, (field_name, parse) in RANGE_FILTERS.items():
+        for bound, lookup in (('min', 'gte'), ('max', 'lte')):
+            param = f'{bound}_{name}'
+            value = params.get(param)
+            if not value:
+                continue
+            try:
+                value = parse(value)
+            except (ValueError, InvalidOperation):
+                raise ValidationError({param: 'Must be a number.'})
+            queryset = queryset.filter(**{f'{field_name}__{lookup}': value})
+    return queryset
+
+
+def filter_recipes(queryset, params):
+    #Apply the query param filters supported by the recipe list
+    for field_name in ('tags', 'ingredients'):
+        queryset = filter_related(queryset, params, field_name)
+    queryset = filter_ranges(queryset, params)
+
+    term = params.get('search', '').strip()
+    if term:
+        queryset = search_recipes(queryset, term)
+    return queryset
+
+
+def get_ordering(params):
+    #Search results are ranked, otherwise ?ordering= (e.g. price, -time_minutes), newest first by default
+    if params.get('search', '').strip():
+        return ('-rank', '-id')
+
+    ordering = params.get('ordering', '-id')
+    if ordering.lstrip('-') not in ORDERING_FIELDS:
+        raise ValidationError({'ordering': f"Must be one of {', '.join(ORDERING_FIELDS)}, optionally prefixed with '-'."})
+    if ordering.lstrip('-') == 'id':
+        return (ordering,)
+    return (ordering, '-id' if ordering.startswith('-') else 'id')
@@ -0,0 +1,164 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+from core.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+#Pillow refuses to open anything over twice this (DecompressionBombError), sniff_image rejects anything over it
+Image.MAX_IMAGE_PIXELS = settings.IMAGE_MAX_PIXELS
+
+#Longest side in pixels of each variant generated from an upload
+VARIANT_SIZES = {
+    'thumbnail': 150,
+    'medium': 600,
+    'large': 1600,
+}
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_PROCESSING_WORKERS,
+            thread_name_prefix='recipe-images',
+        )
+    return _executor
+
+
+def _output_format():
+    #WebP is much smaller for photos, fall back to JPEG if Pillow was built without it
+    if features.check('webp'):
+        return 'WEBP', '.webp'
+    return 'JPEG', '.jpg'
+
+
+class InvalidImage(Exception):
+    pass
+
+
+def sniff_image(image_file):
+    #Check format and dimensions from the header only - Image.open is lazy and doesn't decode pixels.
+    #Returns (format, (width, height)) or raises InvalidImage.
+    try:
+        with Image.open(image_file) as img:
+            fmt, size = img.format, img.size
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+        raise InvalidImage('Upload a valid image.')
+    finally:
+        image_file.seek(0)
+
+    if fmt not in settings.IMAGE_ALLOWED_FORMATS:
+        raise InvalidImage(f'Unsupported image format {fmt}.')
+    if size[0] * size[1] > settings.IMAGE_MAX_PIXELS:
+        raise InvalidImage('Image dimensions are too large.')
+    return fmt, size
+
+
+def make_variants(image_file, base_name):
+    #Decode the upload once and return {variant name: ContentFile}.
+    #Only pixel data is written back out, so EXIF/GPS and other metadata are dropped.
+    fmt, ext = _output_format()
+    with Image.open(image_file) as img:
+        #JPEGs can be decoded at 1/2, 1/4 or 1/8 scale - only decode as much as the largest variant needs
+        largest = max(VARIANT_SIZES.values())
+        img.draft('RGB', (largest, largest))
+        img = ImageOps.exif_transpose(img) #apply the camera rotation before the EXIF is thrown away
+        if img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGB')
+        if fmt == 'JPEG' and img.mode == 'RGBA':
+            img = img.convert('RGB')
+
+        variants = {}
+        for name, size in VARIANT_SIZES.items():
+            resized = img.copy()
+            resized.thumbnail((size, size)) #keeps aspect ratio, never upscales
+            buffer = io.BytesIO()
+            resized.save(buffer, format=fmt, quality=settings.IMAGE_VARIANT_QUALITY)
+            variants[name] = ContentFile(buffer.getvalue(), name=f'{base_name}_{name}{ext}')
+        return variants
+
+
+def stale_images():
+    #Recipes whose image was queued or claimed over IMAGE_PROCESSING_TIMEOUT seconds ago and still isn't done
+    cutoff = timezone.now() - timedelta(seconds=settings.IMAGE_PROCESSING_TIMEOUT)
+    return Recipe.objects.filter(
+        Q(image_claimed_at__lt=cutoff) | Q(image_claimed_at__isnull=True),
+        image_status__in=[Recipe.IMAGE_PENDING, Recipe.IMAGE_PROCESSING],
+    )
+
+
+def process_recipe_image(recipe_id):
+    #Generate the variants for a recipe whose image is pending.
+    #Claims the row first so two workers never process the same image. A claim older than
+    #IMAGE_PROCESSING_TIMEOUT is taken to be from a worker that died, and can be claimed again.
+    claimable = Q(image_status=Recipe.IMAGE_PENDING) | Q(id__in=stale_images().values('id'))
+    claimed = Recipe.objects.filter(claimable, id=recipe_id).update(
+        image_status=Recipe.IMAGE_PROCESSING, image_claimed_at=timezone.now(),
+    )
+    if not claimed:
+        return
+
+    recipe = Recipe.objects.get(id=recipe_id)
+    storage = recipe.image.storage
+    try:
+        base_name = os.path.splitext(recipe.image.name)[0]
+        with storage.open(recipe.image.name, 'rb') as image_file:
+            variants = make_variants(image_file, os.path.basename(base_name))
+
+        paths = {}
+        for name, content in variants.items():
+            paths[name] = storage.save(os.path.join(os.path.dirname(base_name), content.name), content)
+    except Exception:
+        logger.exception('Processing image for recipe %s failed', recipe_id)
+        Recipe.objects.filter(id=recipe_id).update(image_status=Recipe.IMAGE_FAILED)
+        return
+
+    _delete_variants(storage, recipe.image_variants)
+    Recipe.objects.filter(id=recipe_id).update(image_status=Recipe.IMAGE_READY, image_variants=paths)
+
+
+def _delete_variants(storage, variants):
+    for path in variants.values():
+        storage.delete(path)
+
+
+def _run_in_thread(recipe_id):
+    try:
+        process_recipe_image(recipe_id)
+    finally:
+        connection.close() #this thread has its own db connection
+
+
+def enqueue_image_processing(recipe):
+    #Mark the recipe's new image as pending and hand it to the configured processor:
+    #  sync   - process now, in the request (tests)
+    #  thread - process in a background thread of this worker once the upload is committed
+    #  queue  - leave it pending for `manage.py process_images` workers
+    Recipe.objects.filter(id=recipe.id).update(image_status=Recipe.IMAGE_PENDING, image_claimed_at=timezone.now())
+    recipe.image_status = Recipe.IMAGE_PENDING
+
+    mode = settings.IMAGE_PROCESSING_MODE
+    if mode == 'sync':
+        process_recipe_image(recipe.id)
+        recipe.refresh_from_db(fields=['image_status', 'image_variants'])
+    elif mode == 'thread':
+        transaction.on_commit(lambda: _get_executor().submit(_run_in_thread, recipe.id))
+
+
+def requeue_stale_images():
+    #Put images lost with their worker (stale pending/processing rows) back to pending, returns their recipe ids
+    recipe_ids = list(stale_images().order_by('id').values_list('id', flat=True))
+    Recipe.objects.filter(id__in=recipe_ids).update(image_status=Recipe.IMAGE_PENDING, image_claimed_at=timezone.now())
+    return recipe_ids
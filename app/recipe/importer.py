@@ -0,0 +1,173 @@
+import csv
+import json
+from itertools import islice
+
+from django.db import DatabaseError, connection, transaction
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from core.models import Recipe, Tag, Ingredient
+from recipe.cache import invalidate_user
+from recipe.pantry import update_ingredient_counts
+from recipe.search import update_search_vectors
+from recipe.serializers import RecipeDetailSerializer, get_or_create_by_name
+
+#Relations an imported row can carry, as lists of {'name': ...} like the recipe API takes them
+RELATIONS = [('tags', Tag), ('ingredients', Ingredient)]
+
+
+def read_ndjson(stream):
+    #One JSON object per line. Yields (line number, row); undecodable/unparseable lines become a ParseError row.
+    for line_no, line in enumerate(stream, 1):
+        try:
+            if isinstance(line, bytes):
+                line = line.decode('utf-8')
+            if not line.strip():
+                continue
+            row = json.loads(line)
+        except UnicodeDecodeError:
+            row = ParseError('Invalid UTF-8.')
+        except ValueError:
+            row = ParseError('Invalid JSON.')
+        yield line_no, row
+
+
+def _decode_lines(stream, bad_lines, position):
+    #Lines that aren't UTF-8 are recorded in bad_lines (line number -> error) and handed to csv as blank lines.
+    #position['line'] is the number of the last line read, the one a csv.Error is about.
+    for line_no, line in enumerate(stream, 1):
+        position['line'] = line_no
+        if isinstance(line, bytes):
+            try:
+                line = line.decode('utf-8')
+            except UnicodeDecodeError:
+                bad_lines[line_no] = ParseError('Invalid UTF-8.')
+                line = '\n'
+        yield line
+
+
+def read_csv(stream, separator='|'):
+    #Header row with the recipe fields; tags/ingredients columns hold names separated by |.
+    #Undecodable or malformed lines become a ParseError row.
+    bad_lines, position = {}, {'line': 0}
+    reader = csv.DictReader(_decode_lines(stream, bad_lines, position))
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            break
+        except csv.Error as e:
+            bad_lines[position['line']] = ParseError(f'Invalid CSV: {e}')
+            continue
+
+        #rows come out after the bad lines read before them
+        for line_no in sorted(bad_lines):
+            yield line_no, bad_lines.pop(line_no)
+        for field_name, _ in RELATIONS:
+            names = (row.get(field_name) or '').split(separator)
+            row[field_name] = [{'name': name.strip()} for name in names if name.strip()]
+        yield reader.line_num, row
+
+    for line_no in sorted(bad_lines):
+        yield line_no, bad_lines.pop(line_no)
+
+
+class NDJSONParser(BaseParser):
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return read_ndjson(stream or [])
+
+
+class CSVParser(BaseParser):
+    media_type = 'text/csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return read_csv(stream or [])
+
+
+class RecipeImporter:
+    #Imports (row number, data) pairs for one user chunk by chunk:
+    #validate every row, resolve all tag/ingredient names of the chunk at once, then bulk insert the
+    #recipes and their M2M links. Bad rows are reported and skipped, the rest of the batch still goes in.
+
+    def __init__(self, user, chunk_size=500):
+        self.user = user
+        self.chunk_size = chunk_size
+        self.created = 0
+        self.errors = []
+
+    def run(self, rows):
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            self._import_chunk(chunk)
+
+        if self.created:
+            invalidate_user(self.user.id) #bulk_create doesn't send the signals the list cache listens to
+        return {'created': self.created, 'errors': self.errors}
+
+    def _validate(self, chunk):
+        valid = []
+        for row_no, data in chunk:
+            if isinstance(data, ParseError):
+                self.errors.append({'row': row_no, 'errors': {'non_field_errors': [str(data.detail)]}})
+                continue
+            serializer = RecipeDetailSerializer(data=data)
+            if serializer.is_valid():
+                valid.append((row_no, serializer.validated_data))
+            else:
+                self.errors.append({'row': row_no, 'errors': serializer.errors})
+        return valid
+
+    def _import_chunk(self, chunk):
+        valid = self._validate(chunk)
+        if not valid:
+            return
+        try:
+            with transaction.atomic():
+                self._insert(valid)
+            self.created += len(valid)
+        except DatabaseError:
+            #something slipped past validation - retry row by row to find out which
+            for row in valid:
+                try:
+                    with transaction.atomic():
+                        self._insert([row])
+                    self.created += 1
+                except DatabaseError as e:
+                    self.errors.append({'row': row[0], 'errors': {'non_field_errors': [str(e)]}})
+
+    def _insert(self, rows):
+        related = {}
+        for field_name, model in RELATIONS:
+            names = [item['name'] for _, data in rows for item in data.get(field_name, [])]
+            related[field_name] = get_or_create_by_name(model, self.user, names)
+
+        recipes = [
+            Recipe(user=self.user, **{k: v for k, v in data.items() if k not in related})
+            for _, data in rows
+        ]
+        if connection.features.can_return_rows_from_bulk_insert:
+            Recipe.objects.bulk_create(recipes)
+        else:
+            for recipe in recipes: #backend can't give us the new ids from a bulk insert
+                recipe.save()
+
+        for field_name, model in RELATIONS:
+            through = getattr(Recipe, field_name).through
+            fk_name = Recipe._meta.get_field(field_name).m2m_reverse_name()
+            links = {
+                (recipe.id, related[field_name][item['name']].id)
+                for recipe, (_, data) in zip(recipes, rows)
+                for item in data.get(field_name, [])
+            }
+            through.objects.bulk_create([
+                through(recipe_id=recipe_id, **{fk_name: related_id}) for recipe_id, related_id in links
+            ])
+
+        #bulk_create skips the signals that keep these up to date
+        recipe_ids = [recipe.id for recipe in recipes]
+        update_search_vectors(recipe_ids)
+        update_ingredient_counts(recipe_ids)
@@ -0,0 +1,179 @@
+"""
+Django command benchmarking the API endpoints against latency and query count budgets
+"""
+import io
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from PIL import Image
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from core.models import AuthToken
+from rest_framework.test import APIClient
+from recipe.seeding import Seeder
+from user.authentication import CachedTokenAuthentication
+
+
+DEFAULT_BUDGETS = Path(__file__).resolve().parents[2] / 'benchmark_budgets.json'
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def make_image():
+    image = io.BytesIO()
+    Image.new('RGB', (1200, 900), (200, 120, 40)).save(image, format='JPEG')
+    image.seek(0)
+    image.name = 'benchmark.jpg'
+    return image
+
+
+class Command(BaseCommand):
+    # Seeds data inside a transaction that is rolled back, so it can run against any database the app
+    # runs on (a local Postgres: the schema uses Postgres full text search). Requests go through the
+    # full middleware/view stack with the test client.
+
+    help = 'Benchmark API endpoints (p50/p95/p99 latency and queries) and fail when a budget is exceeded.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=10000, help='Recipes for the benchmark user.')
+        parser.add_argument('--tags', type=int, default=200)
+        parser.add_argument('--ingredients', type=int, default=300)
+        parser.add_argument('--iterations', type=int, default=30)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--budgets', default=str(DEFAULT_BUDGETS), help='JSON file of per endpoint budgets.')
+        parser.add_argument('--queries-only', action='store_true',
+                            help='Only enforce query budgets, times vary too much between machines.')
+        parser.add_argument('--update-budgets', action='store_true',
+                            help='Write the measured numbers (times with 50%% headroom) to --budgets.')
+        parser.add_argument('--with-cache', action='store_true', help='Leave the per-user list cache on.')
+
+    def _scenarios(self, client, user, tags, ingredients, recipe_ids, password):
+        recipes_url = reverse('recipe:recipe-list')
+        detail_url = reverse('recipe:recipe-detail', args=[recipe_ids[0]])
+        upload_url = reverse('recipe:recipe-upload-image', args=[recipe_ids[0]])
+        tag_filter = ','.join(str(tag.id) for tag in tags[:3])
+        ingredient_filter = ','.join(str(ingredient.id) for ingredient in ingredients[:3])
+        counter = iter(range(10 ** 9))
+
+        def create_payload():
+            n = next(counter)
+            return {
+                'title': f'Benchmark recipe {n}',
+                'time_minutes': 30,
+                'price': '7.50',
+                'tags': [{'name': tags[0].name}, {'name': f'benchmark tag {n}'}],
+                'ingredients': [{'name': ingredient.name} for ingredient in ingredients[:5]],
+            }
+
+        return [
+            ('list', lambda: client.get(recipes_url, {'page_size': 50})),
+            ('list_filtered', lambda: client.get(recipes_url, {
+                'tags': tag_filter, 'ingredients': ingredient_filter, 'ordering': '-price', 'page_size': 50,
+            })),
+            ('list_search', lambda: client.get(recipes_url, {'search': 'spicy chicken'})),
+            ('detail', lambda: client.get(detail_url)),
+            ('tags', lambda: client.get(reverse('recipe:tag-list'))),
+            ('create', lambda: client.post(recipes_url, create_payload(), format='json')),
+            ('upload_image', lambda: client.post(upload_url, {'image': make_image()}, format='multipart')),
+            ('token', lambda: APIClient().post(reverse('user:token'), {'email': user.email, 'password': password})),
+        ]
+
+    def _measure(self, request, iterations, warmup, prepare):
+        for _ in range(warmup):
+            request()
+
+        times, queries = [], []
+        for _ in range(iterations):
+            prepare()
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = request()
+                times.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                raise CommandError(f'{response.status_code} response: {response.content[:300]!r}')
+            queries.append(len(captured.captured_queries))
+
+        return {
+            'p50_ms': percentile(times, 50),
+            'p95_ms': percentile(times, 95),
+            'p99_ms': percentile(times, 99),
+            'queries': max(queries),
+        }
+
+    def _run(self, options):
+        seeder = Seeder(seed=options['seed'], log=self.stdout.write)
+        password = 'benchmark-pass-123'
+        user = seeder.create_users(1, password=password, email='benchmark-api-{n}@example.com')[0]
+        tags, ingredients, recipe_ids = seeder.seed_user(
+            user, options['recipes'], options['tags'], options['ingredients'],
+        )
+        self.stdout.write(f'Seeded {len(recipe_ids)} recipes, {len(tags)} tags, {len(ingredients)} ingredients')
+
+        key = AuthToken.objects.create(user=user).key
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {key}')
+
+        def prepare():
+            #Every measured request finds its token cached, as in steady state. Otherwise the token lookup shows up
+            #whenever the run outlasts TOKEN_CACHE_TTL (or a login saved the user), and query counts depend on timing.
+            CachedTokenAuthentication().authenticate_credentials(key)
+
+        results = {}
+        for name, request in self._scenarios(client, user, tags, ingredients, recipe_ids, password):
+            results[name] = self._measure(request, options['iterations'], options['warmup'], prepare)
+        return results
+
+    def _check(self, results, budgets, queries_only):
+        failures = []
+        self.stdout.write(f'{"endpoint":<14} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"queries":>8}  budget')
+        for name, result in results.items():
+            budget = budgets.get(name)
+            verdict = 'no budget'
+            if budget:
+                problems = []
+                if result['queries'] > budget['queries']:
+                    problems.append(f'queries {result["queries"]} > {budget["queries"]}')
+                if not queries_only and result['p95_ms'] > budget['p95_ms']:
+                    problems.append(f'p95 {result["p95_ms"]:.1f}ms > {budget["p95_ms"]}ms')
+                verdict = 'FAIL ' + ', '.join(problems) if problems else 'ok'
+                failures += [f'{name}: {problem}' for problem in problems]
+            self.stdout.write(
+                f'{name:<14} {result["p50_ms"]:>8.1f} {result["p95_ms"]:>8.1f} {result["p99_ms"]:>8.1f} '
+                f'{result["queries"]:>8}  {verdict}'
+            )
+        return failures
+
+    def handle(self, *args, **options):
+        budgets_path = Path(options['budgets'])
+        budgets = json.loads(budgets_path.read_text()) if budgets_path.exists() else {}
+
+        with tempfile.TemporaryDirectory() as media_root, override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            MEDIA_ROOT=media_root,
+            IMAGE_PROCESSING_MODE='sync', #background threads would never see the uncommitted data
+            API_CACHE_ENABLED=options['with_cache'] and settings.API_CACHE_ENABLED,
+        ):
+            with transaction.atomic():
+                results = self._run(options)
+                transaction.set_rollback(True)
+
+        if options['update_budgets']:
+            budgets = {
+                name: {'queries': result['queries'], 'p95_ms': round(result['p95_ms'] * 1.5 + 5)}
+                for name, result in results.items()
+            }
+            budgets_path.write_text(json.dumps(budgets, indent=2) + '\n')
+            self.stdout.write(f'Wrote budgets to {budgets_path}')
+
+        failures = self._check(results, budgets, options['queries_only'])
+        if failures:
+            raise CommandError(f'{len(failures)} budget(s) exceeded: ' + '; '.join(failures))
@@ -0,0 +1,75 @@
+"""
+Django command measuring bytes on the wire and CPU cost of response compression.
+The recipes are seeded with recipe.seeding.Seeder and rolled back afterwards.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import CharField, Value
+from django.db.models.functions import Cast, Concat
+from django.http import HttpResponse
+from django.test import RequestFactory
+from core import middleware
+from core.middleware import CompressionMiddleware
+from core.models import Recipe
+from core.renderers import FastJSONRenderer
+from recipe.seeding import Seeder
+from recipe.serializers import RecipeDetailSerializer, RecipeSerializer
+
+
+class Command(BaseCommand):
+    help = 'Benchmark response size and compression time for the recipe list and detail payloads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=500)
+        parser.add_argument('--description-length', type=int, default=400)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def _seed(self, count, description_length, seed):
+        words = 'whisk the eggs with sugar then fold in the flour and bake until golden '
+        description = (words * (description_length // len(words) + 1))[:description_length]
+        seeder = Seeder(seed=seed)
+        user = seeder.create_users(1, email='benchmark-compression-{n}@example.com')[0]
+        _, _, recipe_ids = seeder.seed_user(user, count, 12, 12, tags_per_recipe=3, description=description)
+        Recipe.objects.filter(id__in=recipe_ids).update(
+            link=Concat(Value('https://example.com/recipes/'), Cast('id', CharField())),
+        )
+        return user
+
+    def _measure(self, body, accept_encoding, repeat):
+        compress = CompressionMiddleware(lambda request: HttpResponse(body, content_type='application/json'))
+        request = RequestFactory().get('/api/recipe/recipes/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = compress(request)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return response.get('Content-Encoding', 'identity'), len(response.content), best
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = self._seed(options['recipes'], options['description_length'], options['seed'])
+            recipes = Recipe.objects.filter(user=user).order_by('-id').prefetch_related('tags', 'ingredients')
+            payloads = [
+                ('list', FastJSONRenderer().render(RecipeSerializer(recipes, many=True).data)),
+                ('list with descriptions', FastJSONRenderer().render(RecipeDetailSerializer(recipes, many=True).data)),
+                ('detail', FastJSONRenderer().render(RecipeDetailSerializer(recipes[0]).data)),
+            ]
+            transaction.set_rollback(True)
+
+        encodings = ['', 'gzip']
+        if middleware.brotli is not None:
+            encodings.append('br')
+        else:
+            self.stdout.write('brotli is not installed, measuring gzip only')
+
+        for name, body in payloads:
+            self.stdout.write(f'{name}:')
+            for accept_encoding in encodings:
+                encoding, size, elapsed = self._measure(body, accept_encoding, options['repeat'])
+                self.stdout.write(
+                    f'  {encoding:>8}: {size:>9} bytes ({size / len(body):6.1%}), {elapsed * 1000:.2f}ms CPU'
+                )
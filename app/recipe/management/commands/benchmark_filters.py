@@ -0,0 +1,59 @@
+"""
+Django command comparing the old JOIN + DISTINCT tag/ingredient filter with the EXISTS version
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from core.models import Recipe, Tag, Ingredient
+from recipe.filters import filter_recipes
+
+
+class Command(BaseCommand):
+    # Run against a seeded database, e.g. a user with a very large number of recipes
+
+    help = 'Compare query plans and timings of the recipe tag/ingredient filters.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user-id', type=int, help='Defaults to the user with the most recipes.')
+        parser.add_argument('--ids', type=int, default=3, help='How many tag/ingredient ids to filter on.')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--explain', action='store_true', help='Print EXPLAIN ANALYZE output.')
+
+    def handle(self, *args, **options):
+        user_id = options['user_id']
+        if user_id is None:
+            top = Recipe.objects.values('user').annotate(n=Count('id')).order_by('-n').first()
+            if top is None:
+                raise CommandError('No recipes found, seed some data first.')
+            user_id = top['user']
+
+        tag_ids = list(Tag.objects.filter(user_id=user_id).values_list('id', flat=True)[:options['ids']])
+        ingr_ids = list(Ingredient.objects.filter(user_id=user_id).values_list('id', flat=True)[:options['ids']])
+        params = {
+            'tags': ','.join(map(str, tag_ids)),
+            'ingredients': ','.join(map(str, ingr_ids)),
+        }
+
+        base = Recipe.objects.filter(user_id=user_id)
+        join_qs = base
+        if tag_ids:
+            join_qs = join_qs.filter(tags__id__in=tag_ids)
+        if ingr_ids:
+            join_qs = join_qs.filter(ingredients__id__in=ingr_ids)
+        candidates = {
+            'join + distinct': join_qs.order_by('-id').distinct(),
+            'exists': filter_recipes(base, params).order_by('-id'),
+        }
+
+        for name, queryset in candidates.items():
+            queryset = queryset.values_list('id', flat=True)
+            timings = []
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                count = len(list(queryset))
+                timings.append((time.perf_counter() - start) * 1000)
+
+            self.stdout.write(f'{name}: {count} rows, best {min(timings):.1f}ms, worst {max(timings):.1f}ms')
+            if options['explain']:
+                self.stdout.write(queryset.explain(analyze=True))
@@ -0,0 +1,66 @@
+"""
+Django command comparing per-item cost of RecipeSerializer and the fast list path.
+The recipes are seeded with recipe.seeding.Seeder and rolled back afterwards.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Prefetch
+from rest_framework.renderers import JSONRenderer
+from core.models import Recipe, Tag, Ingredient
+from recipe.fast_list import SCALAR_FIELDS, serialize_recipe_list
+from recipe.seeding import Seeder
+from recipe.serializers import RecipeSerializer
+
+
+class Command(BaseCommand):
+    help = 'Benchmark RecipeSerializer against the fast recipe list serializer.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--tags', type=int, default=3, help='Tags and ingredients per recipe.')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def _seed(self, count, per_recipe, seed):
+        seeder = Seeder(seed=seed)
+        user = seeder.create_users(1, email='benchmark-serializers-{n}@example.com')[0]
+        seeder.seed_user(
+            user, count, per_recipe * 4, per_recipe * 4,
+            tags_per_recipe=per_recipe, ingredients_per_recipe=per_recipe,
+        )
+        return user
+
+    def _time(self, func, repeat):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
+
+    def handle(self, *args, **options):
+        count = options['recipes']
+        with transaction.atomic():
+            user = self._seed(count, options['tags'], options['seed'])
+            queryset = Recipe.objects.filter(user=user).order_by('-id')
+
+            def regular():
+                recipes = queryset.prefetch_related(
+                    Prefetch('tags', queryset=Tag.objects.order_by('id')),
+                    Prefetch('ingredients', queryset=Ingredient.objects.order_by('id')),
+                )
+                return JSONRenderer().render(RecipeSerializer(recipes, many=True).data)
+
+            def fast():
+                return JSONRenderer().render(serialize_recipe_list(queryset.values(*SCALAR_FIELDS)))
+
+            regular_time, regular_out = self._time(regular, options['repeat'])
+            fast_time, fast_out = self._time(fast, options['repeat'])
+            transaction.set_rollback(True)
+
+        for name, elapsed in [('RecipeSerializer', regular_time), ('fast list', fast_time)]:
+            self.stdout.write(f'{name}: {elapsed * 1000:.1f}ms total, {elapsed / count * 1e6:.1f}us per recipe')
+        self.stdout.write(f'speedup: {regular_time / fast_time:.1f}x, identical output: {regular_out == fast_out}')
@@ -0,0 +1,44 @@
+"""
+Django command to bulk import recipes for a user from an NDJSON or CSV file
+"""
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from recipe.importer import RecipeImporter, read_csv, read_ndjson
+
+
+class Command(BaseCommand):
+    # e.g. python manage.py import_recipes recipes.ndjson --user me@example.com
+
+    help = 'Import recipes from an NDJSON or CSV file ("-" for stdin).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--user', required=True, help='Email of the user who will own the recipes.')
+        parser.add_argument('--format', choices=['ndjson', 'csv'], help='Defaults to the file extension.')
+        parser.add_argument('--chunk-size', type=int, default=settings.IMPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user with email {options['user']}")
+
+        path = options['path']
+        fmt = options['format'] or ('csv' if path.endswith('.csv') else 'ndjson')
+        reader = read_csv if fmt == 'csv' else read_ndjson
+
+        importer = RecipeImporter(user, chunk_size=options['chunk_size'])
+        if path == '-':
+            result = importer.run(reader(sys.stdin.buffer))
+        else:
+            with open(path, 'rb') as stream:
+                result = importer.run(reader(stream))
+
+        for error in result['errors']:
+            self.stderr.write(f"row {error['row']}: {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result['created']} recipe(s), {len(result['errors'])} row(s) failed."
+        ))
@@ -0,0 +1,41 @@
+"""
+Django command that processes pending recipe images (IMAGE_PROCESSING_MODE=queue)
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from core.models import Recipe
+from recipe.images import process_recipe_image, stale_images
+
+
+class Command(BaseCommand):
+    # Worker loop: run as many of these as needed, rows are claimed so workers never overlap.
+    # Also picks up images whose worker died mid-job once IMAGE_PROCESSING_TIMEOUT has passed.
+
+    help = 'Generate variants for recipe images waiting to be processed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Process what is pending and exit.')
+        parser.add_argument('--batch-size', type=int, default=20)
+        parser.add_argument('--sleep', type=float, default=2, help='Seconds to wait when nothing is pending.')
+
+    def _next_batch(self, size):
+        return list(
+            Recipe.objects.filter(Q(image_status=Recipe.IMAGE_PENDING) | Q(id__in=stale_images().values('id')))
+            .order_by('id')
+            .values_list('id', flat=True)[:size]
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            recipe_ids = self._next_batch(options['batch_size'])
+            for recipe_id in recipe_ids:
+                process_recipe_image(recipe_id) #skips ids another worker claimed meanwhile
+            if recipe_ids:
+                self.stdout.write(f'Processed {len(recipe_ids)} image(s)')
+            elif options['once']:
+                break
+            else:
+                time.sleep(options['sleep'])
+        self.stdout.write(self.style.SUCCESS('No images pending.'))
@@ -0,0 +1,22 @@
+"""
+Django command that sends recipe images lost with their worker back through processing
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from recipe.images import process_recipe_image, requeue_stale_images
+
+
+class Command(BaseCommand):
+    # In thread mode a job only lives in the memory of the worker that accepted the upload, so one that was
+    # restarted or died mid-job leaves the image pending/processing for good. Run this at startup or from cron:
+    # stale images (over IMAGE_PROCESSING_TIMEOUT) are put back to pending and, unless `process_images`
+    # workers handle them (queue mode), processed right here.
+
+    help = 'Requeue recipe images stuck in pending/processing for over IMAGE_PROCESSING_TIMEOUT seconds.'
+
+    def handle(self, *args, **options):
+        recipe_ids = requeue_stale_images()
+        if settings.IMAGE_PROCESSING_MODE != 'queue':
+            for recipe_id in recipe_ids:
+                process_recipe_image(recipe_id)
+        self.stdout.write(self.style.SUCCESS(f'Requeued {len(recipe_ids)} image(s)'))
@@ -0,0 +1,79 @@
+"""
+Django command generating synthetic users, tags, ingredients and recipes for scale testing
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from recipe.seeding import Seeder, distribution
+
+
+class Command(BaseCommand):
+    # Each chunk of users (with their tags, ingredients, recipes and links) is committed on its own,
+    # so a long run can be stopped and continued with --start at the next free user number.
+
+    help = 'Generate synthetic data in bulk (COPY on Postgres). Counts take N, LOW-HIGH, exp:MEAN or exp:MEAN:MAX.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes-per-user', default='exp:50:5000')
+        parser.add_argument('--tags-per-user', default='20-60')
+        parser.add_argument('--ingredients-per-user', default='50-150')
+        parser.add_argument('--tags-per-recipe', default='1-4')
+        parser.add_argument('--ingredients-per-recipe', default='3-10')
+        parser.add_argument('--no-description', action='store_true', help='Leave recipe descriptions empty.')
+        parser.add_argument('--seed', type=int, default=0, help='Same seed, same data.')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Users per chunk, also recipes per insert.')
+        parser.add_argument('--start', type=int, default=0, help='First user number, for the seed-{n} emails.')
+        parser.add_argument('--email', default='seed-{n}@example.com')
+        parser.add_argument('--password', default='seed-pass-123', help='Shared by every generated user.')
+        parser.add_argument('--no-copy', action='store_true', help='Use bulk_create even on Postgres.')
+        parser.add_argument('--no-search-vectors', action='store_true',
+                            help='Skip filling search_vector (search finds nothing for these recipes).')
+
+    def handle(self, *args, **options):
+        if '{n}' not in options['email']:
+            raise CommandError('--email must contain {n}.')
+        counts = {}
+        for name in ['recipes_per_user', 'tags_per_user', 'ingredients_per_user',
+                     'tags_per_recipe', 'ingredients_per_recipe']:
+            try:
+                counts[name] = distribution(options[name])
+            except ValueError as error:
+                raise CommandError(f'--{name.replace("_", "-")}: {error}')
+
+        seeder = Seeder(
+            seed=options['seed'],
+            chunk_size=options['chunk_size'],
+            use_copy=False if options['no_copy'] else None,
+            search_vectors=not options['no_search_vectors'],
+        )
+        started = time.monotonic()
+        totals = {'users': 0, 'tags': 0, 'ingredients': 0, 'recipes': 0}
+        for chunk_start in range(options['start'], options['start'] + options['users'], options['chunk_size']):
+            chunk_users = min(options['chunk_size'], options['start'] + options['users'] - chunk_start)
+            with transaction.atomic():
+                chunk = seeder.seed(
+                    chunk_users,
+                    description=not options['no_description'],
+                    password=options['password'],
+                    email=options['email'],
+                    start=chunk_start,
+                    **counts,
+                )
+            for key, value in chunk.items():
+                totals[key] += value
+            self.stdout.write(
+                '{users} users, {tags} tags, {ingredients} ingredients, {recipes} recipes'.format(**totals)
+                + f' ({time.monotonic() - started:.0f}s)'
+            )
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE') #fresh planner statistics for the new data
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            'Created {users} users, {tags} tags, {ingredients} ingredients and {recipes} recipes'.format(**totals)
+            + f' in {elapsed:.1f}s ({totals["recipes"] / max(elapsed, 0.001):.0f} recipes/s)'
+        ))
@@ -0,0 +1,140 @@
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+#For the list endpoints' OpenAPI description
+UNPAGINATED_DESCRIPTION = (
+    'Paginated with `page_size` and the `next`/`previous` cursors. Without `cursor` and `page_size` the response is '
+    f'a plain list of at most {settings.API_MAX_PAGE_SIZE} items, when there are more a `Link: <url>; rel="next"` '
+    'header points at the next page.'
+)
+
+
+class KeysetPagination(CursorPagination):
+    #Cursor (keyset) pagination: each page is a "WHERE (key, id) > (last_key, last_id) LIMIT n" so deep pages cost
+    #the same as the first, even when the ordering field has lots of ties (price, time_minutes, recipe_count).
+    #DRF's CursorPagination only keeps the first ordering field in the cursor and steps past ties with OFFSET,
+    #this keeps every ordering field. Cursors are opaque (base64 encoded by DRF).
+    #Opt-in: only used when the client sends ?cursor= or ?page_size=. Otherwise the response stays a plain list as
+    #before, but of at most max_page_size items: when there are more, a `Link: <...>; rel="next"` header holds the
+    #cursor URL of the rest.
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
+    ordering = '-id'
+    unpaginated = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if getattr(view, 'cursor_ordering', self.ordering) is None: #view has no stable keyset order for this request
+            return None
+        self.unpaginated = self.cursor_query_param not in params and self.page_size_query_param not in params
+
+        self.request = request
+        self.page_size = self.max_page_size if self.unpaginated else self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        position = self._decode_position(queryset) if self.cursor is not None else None
+
+        #a previous page is read backwards from the first item of the current one
+        ordering = [_flip(name) for name in self.ordering] if reverse else list(self.ordering)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = _after(queryset, ordering, position)
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.display_page_controls = self.has_next or self.has_previous
+        return self.page
+
+    def get_paginated_response(self, data):
+        if not self.unpaginated:
+            return super().get_paginated_response(data)
+        response = Response(data)
+        next_link = self.get_next_link()
+        if next_link is not None:
+            #continue with pages of the same size
+            next_link = replace_query_param(next_link, self.page_size_query_param, self.page_size)
+            response['Link'] = f'<{next_link}>; rel="next"'
+        return response
+
+    def get_ordering(self, request, queryset, view):
+        #Views declare the ordering they already use so the cursor matches it
+        return tuple(getattr(view, 'cursor_ordering', (self.ordering,)))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self._encode_position(self.page[-1])))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self._encode_position(self.page[0])))
+
+    def _encode_position(self, item):
+        #values of every ordering field, from a model instance or a values() row
+        values = [item[name.lstrip('-')] if isinstance(item, dict) else getattr(item, name.lstrip('-'))
+                  for name in self.ordering]
+        return json.dumps(values, default=str)
+
+    def _decode_position(self, queryset):
+        try:
+            values = json.loads(self.cursor.position)
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError
+            return [_output_field(queryset, name).to_python(value) for name, value in zip(self.ordering, values)]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+
+def _flip(name):
+    return name[1:] if name.startswith('-') else f'-{name}'
+
+
+def _output_field(queryset, name):
+    name = name.lstrip('-')
+    if name in queryset.query.annotations:
+        return queryset.query.annotations[name].output_field
+    return queryset.model._meta.get_field(name)
+
+
+def _after(queryset, ordering, values):
+    #Rows strictly after `values` in `ordering`
+    names = [name.lstrip('-') for name in ordering]
+    descending = {name.startswith('-') for name in ordering}
+    annotated = any(name in queryset.query.annotations for name in names)
+
+    if len(descending) == 1 and not annotated:
+        #one direction, plain columns: a row comparison, which Postgres answers with a seek on the (..., id) index
+        table = connection.ops.quote_name(queryset.model._meta.db_table)
+        columns = ', '.join(
+            f'{table}.{connection.ops.quote_name(queryset.model._meta.get_field(name).column)}' for name in names
+        )
+        placeholders = ', '.join(['%s'] * len(values))
+        operator = '<' if descending == {True} else '>'
+        return queryset.extra(where=[f'({columns}) {operator} ({placeholders})'], params=values)
+
+    #otherwise (a > x) OR (a = x AND b > y) OR ..., e.g. for annotations like recipe_count
+    condition = Q()
+    for i, name in enumerate(ordering):
+        lookup = 'lt' if name.startswith('-') else 'gt'
+        equal = {names[j]: values[j] for j in range(i)}
+        condition |= Q(**equal, **{f'{names[i]}__{lookup}': values[i]})
+    return queryset.filter(condition)
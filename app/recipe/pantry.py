@@ -0,0 +1,41 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from core.models import Recipe
+
+IngredientLink = Recipe.ingredients.through
+
+
+def update_ingredient_counts(recipe_ids):
+    #Refresh the denormalized Recipe.ingredient_count for the given recipes in one UPDATE
+    recipe_ids = [recipe_id for recipe_id in recipe_ids if recipe_id is not None]
+    if not recipe_ids:
+        return
+    count = (
+        IngredientLink.objects.filter(recipe_id=OuterRef('pk'))
+        .order_by().values('recipe_id').annotate(n=Count('id')).values('n')
+    )
+    Recipe.objects.filter(id__in=recipe_ids).update(ingredient_count=Coalesce(Subquery(count), 0))
+
+
+def match_recipes(user, ingredient_ids, limit):
+    #Rank the user's recipes by how much of them the given ingredients cover:
+    #fully makeable first, then fewest missing, then most matched.
+    #Only the through rows of the pantry ingredients are read (ingredient_id index), and the precomputed
+    #ingredient_count gives "missing" without touching the rest of each recipe's ingredients.
+    ranked = list(
+        IngredientLink.objects.filter(ingredient_id__in=ingredient_ids, recipe__user=user)
+        .values('recipe_id')
+        .annotate(matched=Count('id'))
+        .annotate(missing=F('recipe__ingredient_count') - F('matched'))
+        .order_by('missing', '-matched', '-recipe_id')[:limit]
+    )
+
+    recipes = Recipe.objects.filter(id__in=[row['recipe_id'] for row in ranked]).prefetch_related('tags', 'ingredients')
+    recipes = {recipe.id: recipe for recipe in recipes}
+    results = []
+    for row in ranked:
+        recipe = recipes[row['recipe_id']]
+        recipe.matched_count = row['matched']
+        recipe.missing_count = row['missing']
+        results.append(recipe)
+    return results
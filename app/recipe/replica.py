@@ -0,0 +1,20 @@
+from rest_framework.permissions import SAFE_METHODS
+
+from core.db.routers import is_pinned, start_replica_reads, stop_replica_reads
+
+
+class ReplicaReadMixin:
+    #Serve GET/HEAD/OPTIONS from a read replica (core/db/routers.py), unless the user wrote recently.
+    #Runs after authentication, so token lookups and permission checks always read the primary.
+
+    _replica_token = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS and not is_pinned(request.user.pk):
+            self._replica_token = start_replica_reads()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        stop_replica_reads(self._replica_token)
+        self._replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db import connection
+from django.db.models import F, Q
+
+
+#Recipe.search_vector is maintained here rather than with SearchVector() expressions because it mixes
+#the recipe's own columns with its tag and ingredient names, which a single UPDATE can only get via subqueries.
+#Weights: title A, description B, tag/ingredient names C.
+UPDATE_SEARCH_VECTOR_SQL = """
+    UPDATE core_recipe r SET search_vector =
+        setweight(to_tsvector(%(config)s::regconfig, coalesce(r.title, '')), 'A') ||
+        setweight(to_tsvector(%(config)s::regconfig, coalesce(r.description, '')), 'B') ||
+        setweight(to_tsvector(%(config)s::regconfig,
+            coalesce((SELECT string_agg(t.name, ' ') FROM core_tag t
+                      JOIN core_recipe_tags rt ON rt.tag_id = t.id WHERE rt.recipe_id = r.id), '') || ' ' ||
+            coalesce((SELECT string_agg(i.name, ' ') FROM core_ingredient i
+                      JOIN core_recipe_ingredients ri ON ri.ingredient_id = i.id WHERE ri.recipe_id = r.id), '')
+        ), 'C')
+    WHERE r.id = ANY(%(ids)s)
+"""
+
+
+def update_search_vectors(recipe_ids):
+    #Recompute search_vector for the given recipes in one statement (no-op off Postgres)
+    recipe_ids = [recipe_id for recipe_id in recipe_ids if recipe_id is not None]
+    if not recipe_ids or connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(UPDATE_SEARCH_VECTOR_SQL, {
+            'config': settings.SEARCH_CONFIG,
+            'ids': list(recipe_ids),
+        })
+
+
+def search_recipes(queryset, term):
+    #Full text match on the search vector, or a trigram match on the title so typos still find something.
+    #Annotates rank (higher is better) for ordering.
+    query = SearchQuery(term, config=settings.SEARCH_CONFIG, search_type='websearch')
+    return queryset.annotate(
+        rank=SearchRank(F('search_vector'), query) + TrigramSimilarity('title', term),
+    ).filter(Q(search_vector=query) | Q(title__trigram_similar=term))
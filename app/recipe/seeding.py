@@ -0,0 +1,285 @@
+"""
+Bulk synthetic data for benchmarks and scale testing (`manage.py seed_data`, `manage.py benchmark_api`).
+
+Rows go in chunk by chunk: with COPY on Postgres (ids reserved from the sequences up front so links can
+point at them), bulk_create elsewhere. One hashed password is shared by all users, and the derived
+columns (ingredient_count, search_vector) are filled in per chunk, so no per-row signals run.
+The same seed always produces the same data.
+"""
+import io
+import json
+import random
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from core.models import Recipe, Tag, Ingredient
+from recipe.search import update_search_vectors
+
+
+WORDS = [
+    'chicken', 'beef', 'tofu', 'salmon', 'lentil', 'chickpea', 'mushroom', 'spinach', 'tomato', 'potato',
+    'garlic', 'ginger', 'lemon', 'lime', 'coconut', 'peanut', 'sesame', 'honey', 'chili', 'basil',
+    'curry', 'stew', 'salad', 'soup', 'pie', 'tart', 'noodles', 'risotto', 'tacos', 'roast',
+    'smoky', 'spicy', 'creamy', 'crispy', 'quick', 'easy', 'baked', 'grilled', 'braised', 'fried',
+]
+DESCRIPTION = (
+    'Heat the oil in a large pan, add the onion and cook until soft. Stir in the spices, then the rest of '
+    'the ingredients, season well and simmer until thick. Serve hot with rice or bread. '
+)
+
+
+def distribution(spec):
+    #Returns a function rng -> int for a count spec:
+    #  5 / '5'         always 5
+    #  (1, 4) / '1-4'  uniform between 1 and 4
+    #  'exp:50'        exponential with mean 50 (many small, a long tail of big ones)
+    #  'exp:50:5000'   the same, capped at 5000
+    if callable(spec):
+        return spec
+    if isinstance(spec, int):
+        return lambda rng: spec
+    if isinstance(spec, (tuple, list)):
+        low, high = spec
+        return lambda rng: rng.randint(low, high)
+
+    spec = str(spec).strip()
+    try:
+        if spec.startswith('exp:'):
+            parts = spec.split(':')[1:]
+            mean = float(parts[0])
+            cap = int(parts[1]) if len(parts) > 1 else None
+            def exponential(rng):
+                value = int(rng.expovariate(1 / mean)) if mean > 0 else 0
+                return min(value, cap) if cap is not None else value
+            return exponential
+        if '-' in spec:
+            low, high = (int(part) for part in spec.split('-', 1))
+            return distribution((low, high))
+        return distribution(int(spec))
+    except (ValueError, IndexError, ZeroDivisionError):
+        raise ValueError(f'Invalid count {spec!r}, use N, LOW-HIGH, exp:MEAN or exp:MEAN:MAX.')
+
+
+def _copy_value(value):
+    #One value in COPY text format
+    if isinstance(value, int) and not isinstance(value, bool):
+        return str(value)
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if hasattr(value, 'adapted'): #psycopg2 Json adapter from JSONField.get_db_prep_save
+        value = json.dumps(value.adapted)
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+class Seeder:
+
+    def __init__(self, seed=0, chunk_size=5000, use_copy=None, search_vectors=True, log=None):
+        self.random = random.Random(seed)
+        self.chunk_size = chunk_size
+        self.use_copy = connection.vendor == 'postgresql' if use_copy is None else use_copy
+        self.search_vectors = search_vectors
+        self.log = log or (lambda message: None)
+        self._inserted = 0
+        self._analyze_at = 0
+
+    def _chunks(self, count, start=0):
+        for chunk_start in range(start, start + count, self.chunk_size):
+            yield chunk_start, min(start + count, chunk_start + self.chunk_size)
+
+    def pick_count(self, spec):
+        return distribution(spec)(self.random)
+
+    # Inserting
+
+    def _reserve_ids(self, model, count):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)',
+                [model._meta.db_table, model._meta.pk.column, count],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def _copy(self, table, columns, rows):
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write('\t'.join(_copy_value(value) for value in row))
+            buffer.write('\n')
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                'COPY {} ({}) FROM STDIN'.format(
+                    connection.ops.quote_name(table),
+                    ', '.join(connection.ops.quote_name(column) for column in columns),
+                ),
+                buffer,
+            )
+
+    def _insert(self, model, objs):
+        #Insert model instances and return them with their ids set
+        if not objs:
+            return objs
+        if not self.use_copy:
+            return model.objects.bulk_create(objs, batch_size=self.chunk_size)
+
+        for obj, pk in zip(objs, self._reserve_ids(model, len(objs))):
+            obj.pk = pk
+        fields = model._meta.concrete_fields
+        db = connections[DEFAULT_DB_ALIAS] #the `connection` proxy costs a lookup per access, per field per row
+        self._copy(
+            model._meta.db_table,
+            [field.column for field in fields],
+            ([field.get_db_prep_save(field.pre_save(obj, True), db) for field in fields] for obj in objs),
+        )
+        return objs
+
+    def _insert_links(self, through, column, pairs):
+        #pairs: (recipe_id, other_id) rows for a Recipe m2m through table
+        if not pairs:
+            return
+        if self.use_copy:
+            self._copy(through._meta.db_table, ['recipe_id', f'{column}_id'], pairs)
+        else:
+            through.objects.bulk_create(
+                [through(**{'recipe_id': recipe_id, f'{column}_id': other_id}) for recipe_id, other_id in pairs],
+                batch_size=self.chunk_size,
+            )
+
+    # Users, tags and ingredients
+
+    def create_users(self, count, password='seed-pass-123', email='seed-{n}@example.com', start=0):
+        #Hashing once instead of per user is most of the speedup here
+        hashed = make_password(password)
+        User = get_user_model()
+        users = []
+        for chunk_start, chunk_end in self._chunks(count, start):
+            users += self._insert(User, [
+                User(email=email.format(n=n), name=f'Seed user {n}', password=hashed)
+                for n in range(chunk_start, chunk_end)
+            ])
+        return users
+
+    def create_attrs(self, model, user, count, prefix):
+        return self._insert(model, [model(user=user, name=f'{prefix} {n}') for n in range(count)])
+
+    # Recipes
+
+    def create_recipes(self, user, count, tags, ingredients, tags_per_recipe=(1, 4),
+                       ingredients_per_recipe=(3, 10), description=True):
+        #description: True for the stock DESCRIPTION, False for none, or the text to use
+        return self._create_recipes(
+            [(user.id, count, [tag.id for tag in tags], [ingredient.id for ingredient in ingredients])],
+            tags_per_recipe, ingredients_per_recipe, description,
+        )
+
+    def _create_recipes(self, plan, tags_per_recipe, ingredients_per_recipe, description):
+        #plan: (user_id, recipe count, tag ids, ingredient ids) per user, inserted chunk_size recipes at a time
+        pick_tags = distribution(tags_per_recipe)
+        pick_ingredients = distribution(ingredients_per_recipe)
+        text = description if isinstance(description, str) else (DESCRIPTION if description else '')
+        rng = self.random
+        recipe_ids = []
+        pending = []
+
+        for user_id, count, tag_ids, ingredient_ids in plan:
+            for _ in range(count):
+                recipe_tags = rng.sample(tag_ids, min(len(tag_ids), pick_tags(rng)))
+                recipe_ingredients = rng.sample(ingredient_ids, min(len(ingredient_ids), pick_ingredients(rng)))
+                recipe = Recipe(
+                    user_id=user_id,
+                    title=' '.join(rng.sample(WORDS, 3)).capitalize(),
+                    time_minutes=rng.randint(5, 240),
+                    price=Decimal(rng.randint(100, 5000)) / 100,
+                    description=text,
+                    ingredient_count=len(recipe_ingredients),
+                )
+                pending.append((recipe, recipe_tags, recipe_ingredients))
+                if len(pending) >= self.chunk_size:
+                    recipe_ids += self._flush_recipes(pending)
+                    pending = []
+        recipe_ids += self._flush_recipes(pending)
+        return recipe_ids
+
+    def _flush_recipes(self, pending):
+        if not pending:
+            return []
+        recipes = self._insert(Recipe, [recipe for recipe, _, _ in pending])
+        self._insert_links(Recipe.tags.through, 'tag', [
+            (recipe.id, tag_id) for recipe, (_, tag_ids, _) in zip(recipes, pending) for tag_id in tag_ids
+        ])
+        self._insert_links(Recipe.ingredients.through, 'ingredient', [
+            (recipe.id, ingredient_id)
+            for recipe, (_, _, ingredient_ids) in zip(recipes, pending) for ingredient_id in ingredient_ids
+        ])
+
+        ids = [recipe.id for recipe in recipes]
+        self._inserted += len(ids)
+        if self.search_vectors:
+            self._analyze()
+            update_search_vectors(ids)
+        return ids
+
+    def _analyze(self):
+        #Freshly loaded tables have no planner statistics, and the search vector UPDATE then picks hash joins
+        #over whole tables for every recipe. Refresh them whenever the recipe count has doubled.
+        if connection.vendor != 'postgresql' or self._inserted < self._analyze_at:
+            return
+        tables = [Recipe, Tag, Ingredient, Recipe.tags.through, Recipe.ingredients.through]
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE {}'.format(', '.join(
+                connection.ops.quote_name(model._meta.db_table) for model in tables
+            )))
+        self._analyze_at = self._inserted * 2
+
+    def seed_user(self, user, recipes, tags, ingredients, **recipe_options):
+        #A user's tags, ingredients and recipes, returns (tags, ingredients, recipe_ids)
+        user_tags = self.create_attrs(Tag, user, tags, 'tag')
+        user_ingredients = self.create_attrs(Ingredient, user, ingredients, 'ingredient')
+        recipe_ids = self.create_recipes(user, recipes, user_tags, user_ingredients, **recipe_options)
+        return user_tags, user_ingredients, recipe_ids
+
+    def seed(self, users, recipes_per_user, tags_per_user, ingredients_per_user, tags_per_recipe=(1, 4),
+             ingredients_per_recipe=(3, 10), description=True, password='seed-pass-123',
+             email='seed-{n}@example.com', start=0):
+        #Many users at once, chunk_size users (with their tags, ingredients and recipes) at a time.
+        #Returns totals per model.
+        pick_recipes = distribution(recipes_per_user)
+        pick_tags = distribution(tags_per_user)
+        pick_ingredients = distribution(ingredients_per_user)
+        totals = {'users': 0, 'tags': 0, 'ingredients': 0, 'recipes': 0}
+
+        for chunk_start, chunk_end in self._chunks(users, start):
+            chunk_users = self.create_users(chunk_end - chunk_start, password, email, start=chunk_start)
+            counts = [
+                (pick_recipes(self.random), pick_tags(self.random), pick_ingredients(self.random))
+                for _ in chunk_users
+            ]
+            tags = self._insert(Tag, [
+                Tag(user=user, name=f'tag {n}') for user, (_, n_tags, _) in zip(chunk_users, counts) for n in range(n_tags)
+            ])
+            ingredients = self._insert(Ingredient, [
+                Ingredient(user=user, name=f'ingredient {n}')
+                for user, (_, _, n_ingredients) in zip(chunk_users, counts) for n in range(n_ingredients)
+            ])
+
+            tag_ids, ingredient_ids = {}, {}
+            for tag in tags:
+                tag_ids.setdefault(tag.user_id, []).append(tag.id)
+            for ingredient in ingredients:
+                ingredient_ids.setdefault(ingredient.user_id, []).append(ingredient.id)
+
+            plan = [
+                (user.id, n_recipes, tag_ids.get(user.id, []), ingredient_ids.get(user.id, []))
+                for user, (n_recipes, _, _) in zip(chunk_users, counts)
+            ]
+            recipe_ids = self._create_recipes(plan, tags_per_recipe, ingredients_per_recipe, description)
+
+            totals['users'] += len(chunk_users)
+            totals['tags'] += len(tags)
+            totals['ingredients'] += len(ingredients)
+            totals['recipes'] += len(recipe_ids)
+            self.log('{users} users, {tags} tags, {ingredients} ingredients, {recipes} recipes'.format(**totals))
+        return totals
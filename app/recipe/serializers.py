@@ -1,45 +1,84 @@
+from django.db import transaction
 from rest_framework import serializers
+from django.conf import settings
+from core.instrumentation import TimedListSerializer, TimedSerializerMixin, timed_method
 from core.models import Recipe, Tag, Ingredient  #database holding info about recipes
-
-class TagSerializer(serializers.ModelSerializer):
+from recipe.images import InvalidImage, sniff_image
+
+
+def get_or_create_by_name(model, user, names):
+    #Resolve a list of names to Tag/Ingredient objects for user in bulk.
+    #One select for existing rows, one insert for the missing ones (plus one select to pick up their ids).
+    names = list(dict.fromkeys(names)) #drop duplicates but keep payload order
+    if not names:
+        return {}
+
+    existing = {obj.name: obj for obj in model.objects.filter(user=user, name__in=names)}
+    missing = [name for name in names if name not in existing]
+    if missing:
+        #ignore_conflicts so a concurrent request creating the same name doesn't make us fail
+        model.objects.bulk_create(
+            [model(user=user, name=name) for name in missing],
+            ignore_conflicts=True,
+        )
+        existing.update(
+            (obj.name, obj) for obj in model.objects.filter(user=user, name__in=missing)
+        )
+
+    return {name: existing[name] for name in names}
+
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Tag
+        list_serializer_class = TimedListSerializer
         fields = ['id', 'name']
         read_only_fields = ['id']
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Ingredient
+        list_serializer_class = TimedListSerializer
         fields = ['id', 'name']
         read_only_fields = ['id']
 
-class RecipeSerializer(serializers.ModelSerializer):
+class TagUsageSerializer(TagSerializer):
+    #Tag with the number of recipes using it (needs the recipe_count annotation)
+    recipe_count = serializers.IntegerField(read_only=True)
+
+    class Meta(TagSerializer.Meta):
+        fields = TagSerializer.Meta.fields + ['recipe_count']
+
+class IngredientUsageSerializer(IngredientSerializer):
+    recipe_count = serializers.IntegerField(read_only=True)
+
+    class Meta(IngredientSerializer.Meta):
+        fields = IngredientSerializer.Meta.fields + ['recipe_count']
+
+class RecipeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     tags = TagSerializer(many=True, required=False) #adds nested serializer (a model within a model, so a single recipe can have a list of tag objects)
     ingredients = IngredientSerializer(many=True, required=False)
     class Meta:
         model = Recipe
+        list_serializer_class = TimedListSerializer
         fields = ['id', 'title', 'time_minutes', 'price', 'link', 'tags', 'ingredients']
         read_only_fields = ['id']
 
-    def _get_or_create_tags(self, tags, recipe):
+    def _set_related(self, recipe, field_name, model, items):
+        #Link recipe to the given tags/ingredients, resolving all names at once instead of one get_or_create each
         auth_user = self.context['request'].user
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(
-                user = auth_user,
-                **tag, #make sure all fields in tag are created
-            )
-            recipe.tags.add(tag_obj) #*2*
+        objs = get_or_create_by_name(model, auth_user, [item['name'] for item in items])
+        if objs:
+            getattr(recipe, field_name).add(*objs.values()) #single insert into the through table for every link
+
+    def _get_or_create_tags(self, tags, recipe):
+        self._set_related(recipe, 'tags', Tag, tags)
 
     def _get_or_create_ingredients(self, ingredients, recipe):
-        auth_user = self.context['request'].user
-        for ingr in ingredients:
-            ingr_obj, created = Ingredient.objects.get_or_create(
-                user = auth_user,
-                **ingr, #make sure all fields in tag are created
-            )
-            recipe.ingredients.add(ingr_obj) #*2*
+        self._set_related(recipe, 'ingredients', Ingredient, ingredients)
 
     #Custom logic that allows addition of tags (a nested serializer which is read only by default)
+    @timed_method('save')
+    @transaction.atomic
     def create(self, validated_data): #overrides default
 
         tags = validated_data.pop('tags', []) #remove tag object from validated data (like get, but removes data from list if it exists. If DNE return empty list)
@@ -52,6 +91,8 @@ class RecipeSerializer(serializers.ModelSerializer):
 
         return recipe
 
+    @timed_method('save')
+    @transaction.atomic
     def update(self, instance, validated_data):
         #overrides default
         tags = validated_data.pop('tags', None)
@@ -73,20 +114,53 @@ class RecipeSerializer(serializers.ModelSerializer):
 
 
 
-class RecipeDetailSerializer(RecipeSerializer):
+class RecipeMatchSerializer(RecipeSerializer):
+    #Recipe ranked against a set of ingredients the user has
+    matched_count = serializers.IntegerField(read_only=True)
+    missing_count = serializers.IntegerField(read_only=True)
 
     class Meta(RecipeSerializer.Meta):
-        fields = RecipeSerializer.Meta.fields + ['description']
-
-class RecipeImageSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Recipe
-        fields = ['id', 'image']
-        read_only_fields = ['id']
-        extra_kwargs = {'image' : {'required':'True'}}
+        fields = RecipeSerializer.Meta.fields + ['matched_count', 'missing_count']
 
+class RecipeImageVariantsMixin(serializers.Serializer):
+    #URLs of the resized copies of the image, filled in once processing is done
+    image_variants = serializers.SerializerMethodField()
 
+    def get_image_variants(self, obj):
+        request = self.context.get('request')
+        storage = Recipe._meta.get_field('image').storage #not obj.image, which may be deferred
+        urls = {}
+        for name, path in obj.image_variants.items():
+            url = storage.url(path)
+            urls[name] = request.build_absolute_uri(url) if request else url
+        return urls
 
+class RecipeDetailSerializer(RecipeImageVariantsMixin, RecipeSerializer):
 
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ['description', 'image_status', 'image_variants']
+        read_only_fields = RecipeSerializer.Meta.read_only_fields + ['image_status']
+
+class ImageUploadField(serializers.FileField):
+    #Validates an image from its size and header only, instead of having Pillow open/verify the whole file
+    #(the background processor does the one full decode)
+
+    def to_internal_value(self, data):
+        file_object = super().to_internal_value(data)
+        if file_object.size > settings.IMAGE_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                f'Image is larger than {settings.IMAGE_UPLOAD_MAX_SIZE} bytes.'
+            )
+        try:
+            sniff_image(file_object)
+        except InvalidImage as e:
+            raise serializers.ValidationError(str(e))
+        return file_object
 
+class RecipeImageSerializer(TimedSerializerMixin, RecipeImageVariantsMixin, serializers.ModelSerializer):
+    image = ImageUploadField(required=True)
 
+    class Meta:
+        model = Recipe
+        fields = ['id', 'image', 'image_status', 'image_variants']
+        read_only_fields = ['id', 'image_status']
@@ -0,0 +1,79 @@
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+from core.models import Recipe, Tag, Ingredient
+from recipe.cache import invalidate_user
+from recipe.pantry import update_ingredient_counts
+from recipe.search import update_search_vectors
+
+
+#Drop a user's cached lists whenever something they can list changes
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_owner(sender, instance, **kwargs):
+    invalidate_user(instance.user_id)
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_on_m2m_change(sender, instance, action, **kwargs):
+    #instance is the Recipe, or the Tag/Ingredient for reverse changes - both have a user
+    if action.startswith('post_'):
+        invalidate_user(instance.user_id)
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_user_lists(sender, instance, **kwargs):
+    #covers new users (ids can be reused on some backends) and deactivations
+    invalidate_user(instance.pk)
+
+
+#Keep Recipe.search_vector and Recipe.ingredient_count in step with the recipe and its tags/ingredients
+
+def update_derived_fields(recipe_ids, ingredients_changed):
+    update_search_vectors(recipe_ids)
+    if ingredients_changed:
+        update_ingredient_counts(recipe_ids)
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_derived_fields(sender, instance, created, **kwargs):
+    #save() writes back whatever ingredient_count the instance had in memory, so recompute it on updates
+    update_derived_fields([instance.pk], ingredients_changed=not created)
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def update_derived_fields_on_m2m_change(sender, instance, action, reverse, pk_set, **kwargs):
+    ingredients_changed = sender is Recipe.ingredients.through
+    if not reverse: #recipe.tags.add(...) etc.
+        if action.startswith('post_'):
+            update_derived_fields([instance.pk], ingredients_changed)
+        return
+
+    #tag.recipe_set.add(...) etc. - pk_set holds recipe ids, except for clear
+    if action == 'pre_clear':
+        instance._cleared_recipe_ids = list(instance.recipe_set.values_list('id', flat=True))
+    elif action == 'post_clear':
+        update_derived_fields(getattr(instance, '_cleared_recipe_ids', []), ingredients_changed)
+    elif action in ('post_add', 'post_remove'):
+        update_derived_fields(pk_set or [], ingredients_changed)
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def remember_recipes_before_delete(sender, instance, **kwargs):
+    #the links are removed by cascade, which sends no m2m_changed
+    instance._linked_recipe_ids = list(instance.recipe_set.values_list('id', flat=True))
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def update_search_vectors_on_rename(sender, instance, created, **kwargs):
+    #a rename changes the text of every recipe using it
+    if not created:
+        update_search_vectors(instance.recipe_set.values_list('id', flat=True))
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def update_derived_fields_on_delete(sender, instance, **kwargs):
+    update_derived_fields(getattr(instance, '_linked_recipe_ids', []), sender is Ingredient)
@@ -0,0 +1,170 @@
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.checks import check_api_cache
+from core.models import Recipe, Tag
+from recipe.pagination import KeysetPagination
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def create_recipe(user, **params):
+    defaults = {
+        'title' : 'Sample recipe name',
+        'time_minutes' : 5,
+        'price' : Decimal('5.50'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+@override_settings(API_CACHE_ENABLED=True)
+class ListCacheTests(TestCase):
+    #Tests for the per-user list cache and ETags
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('user@example.com', 'testpass')
+        self.client.force_authenticate(self.user)
+
+    def test_second_list_served_from_cache(self):
+        create_recipe(user=self.user)
+        self.client.get(RECIPES_URL)
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_next_link_cached(self):
+        for n in range(3):
+            create_recipe(user=self.user)
+        with patch.object(KeysetPagination, 'max_page_size', 2):
+            link = self.client.get(RECIPES_URL)['Link']
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(res.data), 2)
+        self.assertEqual(res['Link'], link)
+
+    def test_save_invalidates(self):
+        self.client.get(TAGS_URL)
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual([t['name'] for t in res.data], ['Vegan'])
+
+    def test_delete_invalidates(self):
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(TAGS_URL)
+        tag.delete()
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.data, [])
+
+    def test_m2m_change_invalidates(self):
+        recipe = create_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(RECIPES_URL)
+        recipe.tags.add(tag)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data[0]['tags'], [{'id': tag.id, 'name': 'Vegan'}])
+
+    def test_query_params_cached_separately(self):
+        r1 = create_recipe(user=self.user)
+        create_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        r1.tags.add(tag)
+
+        all_res = self.client.get(RECIPES_URL)
+        filtered_res = self.client.get(RECIPES_URL, {'tags': str(tag.id)})
+
+        self.assertEqual(len(all_res.data), 2)
+        self.assertEqual([r['id'] for r in filtered_res.data], [r1.id])
+
+    def test_cache_is_per_user(self):
+        other_user = get_user_model().objects.create_user('other@example.com', 'testpass')
+        create_recipe(user=other_user)
+        other_client = APIClient()
+        other_client.force_authenticate(other_user)
+        other_client.get(RECIPES_URL)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data, [])
+
+    def test_if_none_match_returns_304(self):
+        create_recipe(user=self.user)
+        res = self.client.get(RECIPES_URL)
+        etag = res['ETag']
+
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertFalse(res.content)
+
+    def test_etag_changes_after_write(self):
+        res = self.client.get(RECIPES_URL)
+        etag = res['ETag']
+        create_recipe(user=self.user)
+
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_detail_if_none_match_returns_304(self):
+        recipe = create_recipe(user=self.user)
+        url = reverse('recipe:recipe-detail', args=[recipe.id])
+        res = self.client.get(url)
+        etag = res['ETag']
+        self.assertFalse(etag.startswith('W/'))
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertFalse(res.content)
+
+        #the weakened ETag a client gets back from a compressed response matches too
+        res = self.client.get(url, HTTP_IF_NONE_MATCH='W/' + etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_etag_changes_after_update(self):
+        recipe = create_recipe(user=self.user)
+        url = reverse('recipe:recipe-detail', args=[recipe.id])
+        etag = self.client.get(url)['ETag']
+
+        self.client.patch(url, {'title': 'New title'})
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['title'], 'New title')
+        self.assertNotEqual(res['ETag'], etag)
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    #Tests for the system check refusing a per-process cache for the list cache
+
+    @override_settings(API_CACHE_ENABLED=True)
+    def test_locmem_cache_rejected(self):
+        errors = check_api_cache(None)
+        self.assertEqual([error.id for error in errors], ['core.E001'])
+
+    @override_settings(API_CACHE_ENABLED=True, CACHES={'default': {'BACKEND': 'django_redis.cache.RedisCache'}})
+    def test_shared_cache_accepted(self):
+        self.assertEqual(check_api_cache(None), [])
+
+    @override_settings(API_CACHE_ENABLED=False)
+    def test_disabled_cache_accepted(self):
+        self.assertEqual(check_api_cache(None), [])
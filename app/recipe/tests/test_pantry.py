@@ -0,0 +1,80 @@
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Recipe, Ingredient
+
+PANTRY_URL = reverse('recipe:recipe-pantry')
+
+
+def create_recipe(user, ingredients, **params):
+    defaults = {
+        'title' : 'Sample recipe name',
+        'time_minutes' : 5,
+        'price' : Decimal('5.50'),
+    }
+    defaults.update(params)
+    recipe = Recipe.objects.create(user=user, **defaults)
+    recipe.ingredients.add(*ingredients)
+    return recipe
+
+class PantryApiTests(TestCase):
+    #Tests for ranking recipes by ingredients on hand
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('user@example.com', 'testpass')
+        self.client.force_authenticate(self.user)
+        self.eggs, self.flour, self.milk, self.sugar = [
+            Ingredient.objects.create(user=self.user, name=name)
+            for name in ['Eggs', 'Flour', 'Milk', 'Sugar']
+        ]
+
+    def pantry(self, *ingredients):
+        res = self.client.get(PANTRY_URL, {'ingredients': ','.join(str(i.id) for i in ingredients)})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_ranked_by_coverage(self):
+        cake = create_recipe(self.user, [self.eggs, self.flour, self.milk, self.sugar], title='Cake')
+        omelette = create_recipe(self.user, [self.eggs], title='Omelette')
+        pancakes = create_recipe(self.user, [self.eggs, self.flour, self.milk], title='Pancakes')
+        create_recipe(self.user, [self.sugar], title='Caramel') #nothing in common
+
+        data = self.pantry(self.eggs, self.flour)
+
+        self.assertEqual([r['id'] for r in data], [omelette.id, pancakes.id, cake.id])
+        self.assertEqual([r['missing_count'] for r in data], [0, 1, 2])
+        self.assertEqual([r['matched_count'] for r in data], [1, 2, 2])
+
+    def test_counts_follow_ingredient_changes(self):
+        recipe = create_recipe(self.user, [self.eggs, self.flour])
+        recipe.ingredients.remove(self.flour)
+        self.assertEqual(self.pantry(self.eggs)[0]['missing_count'], 0)
+
+        self.milk.recipe_set.add(recipe)
+        self.assertEqual(self.pantry(self.eggs)[0]['missing_count'], 1)
+
+        self.milk.delete()
+        self.assertEqual(self.pantry(self.eggs)[0]['missing_count'], 0)
+
+    def test_count_survives_recipe_update(self):
+        recipe = create_recipe(self.user, [self.eggs, self.flour])
+        recipe = Recipe.objects.get(id=recipe.id)
+        recipe.title = 'Renamed'
+        recipe.save()
+
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.ingredient_count, 2)
+
+    def test_limited_to_user(self):
+        other_user = get_user_model().objects.create_user('other@example.com', 'testpass')
+        create_recipe(other_user, [self.eggs])
+
+        self.assertEqual(self.pantry(self.eggs), [])
+
+    def test_ingredients_required(self):
+        res = self.client.get(PANTRY_URL)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,15 +1,25 @@
+from datetime import timedelta
 from decimal import Decimal
+from io import StringIO
+import json
 import tempfile
 import os
+from unittest.mock import patch
 from PIL import Image
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APIClient
 from core.models import Recipe, Tag, Ingredient
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
+from recipe.pagination import KeysetPagination
 
 RECIPES_URL = reverse('recipe:recipe-list')
 
@@ -40,6 +50,19 @@ def create_recipe(user, **params):
     recipe = Recipe.objects.create(user=user, **defaults)
     return recipe
 
+def count_queries(func, *args, **kwargs):
+    #Run func and return (result, number of queries it made)
+    with CaptureQueriesContext(connection) as ctx:
+        result = func(*args, **kwargs)
+    return result, len(ctx.captured_queries)
+
+def create_recipe_with_relations(user, n):
+    #Create a recipe with a tag and an ingredient attached
+    recipe = create_recipe(user=user, title=f'Recipe {n}')
+    recipe.tags.add(Tag.objects.create(user=user, name=f'Tag {n}'))
+    recipe.ingredients.add(Ingredient.objects.create(user=user, name=f'Ingredient {n}'))
+    return recipe
+
 class PublicRecipeAPITests(TestCase):
     #Unauthenticated tests
 
@@ -359,6 +382,141 @@ class PrivateRecipeApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(recipe.ingredients.count(), 0)
 
+    def test_list_query_count_constant(self):
+        #Listing recipes should not make extra queries per recipe (N+1)
+        create_recipe_with_relations(self.user, 0)
+        res, small = count_queries(self.client.get, RECIPES_URL)
+        self.assertEqual(len(res.data), 1)
+
+        for n in range(1, 10):
+            create_recipe_with_relations(self.user, n)
+        res, large = count_queries(self.client.get, RECIPES_URL)
+        self.assertEqual(len(res.data), 10)
+
+        self.assertEqual(small, large)
+
+    def test_list_does_not_load_description(self):
+        #description is only rendered on detail, so the list query shouldn't select it
+        create_recipe(user=self.user)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(RECIPES_URL)
+
+        recipe_sql = [q['sql'] for q in ctx.captured_queries if 'FROM "core_recipe"' in q['sql']]
+        self.assertTrue(recipe_sql)
+        self.assertNotIn('"description"', recipe_sql[0])
+
+    def test_list_unpaginated_by_default(self):
+        create_recipe(user=self.user)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsInstance(res.data, list)
+
+    def test_list_cursor_pagination(self):
+        #Walk every page with the opaque next cursor and get each recipe exactly once, newest first
+        recipes = [create_recipe(user=self.user, title=f'Recipe {n}') for n in range(5)]
+
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNone(res.data['previous'])
+
+        seen = []
+        while True:
+            self.assertLessEqual(len(res.data['results']), 2)
+            seen += [r['id'] for r in res.data['results']]
+            if not res.data['next']:
+                break
+            res = self.client.get(res.data['next'])
+
+        self.assertEqual(seen, [r.id for r in reversed(recipes)])
+
+    @patch.object(KeysetPagination, 'max_page_size', 2)
+    def test_list_page_size_capped(self):
+        for n in range(3):
+            create_recipe(user=self.user)
+
+        res = self.client.get(RECIPES_URL, {'page_size': 1000})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 2)
+
+    @patch.object(KeysetPagination, 'max_page_size', 2)
+    def test_unpaginated_list_capped(self):
+        #Clients not asking for pages still get a plain list, at most max_page_size long, and a Link to the rest
+        recipes = [create_recipe(user=self.user, title=f'Recipe {n}') for n in range(3)]
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual([r['id'] for r in res.data], [recipes[2].id, recipes[1].id])
+        next_url, rel = res['Link'].split('; ')
+        self.assertEqual(rel, 'rel="next"')
+        res = self.client.get(next_url.strip('<>'))
+        self.assertEqual([r['id'] for r in res.data['results']], [recipes[0].id])
+        self.assertIsNone(res.data['next'])
+
+    @patch.object(KeysetPagination, 'max_page_size', 2)
+    def test_unpaginated_list_under_cap_has_no_link(self):
+        create_recipe(user=self.user)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(res.data), 1)
+        self.assertNotIn('Link', res)
+
+    @override_settings(API_CACHE_ENABLED=False)
+    def test_fast_list_matches_serializer(self):
+        #The fast list path must render exactly what RecipeSerializer renders
+        for n in range(3):
+            recipe = create_recipe_with_relations(self.user, n)
+            recipe.tags.add(Tag.objects.create(user=self.user, name=f'Extra tag {n}'))
+        create_recipe(user=self.user, title='No relations', price=Decimal('10'))
+
+        for params in [{}, {'page_size': 2}, {'ordering': 'price'}]:
+            with self.settings(RECIPE_FAST_LIST=True):
+                fast = self.client.get(RECIPES_URL, params)
+            with self.settings(RECIPE_FAST_LIST=False):
+                regular = self.client.get(RECIPES_URL, params)
+
+            self.assertEqual(fast.status_code, status.HTTP_200_OK)
+            self.assertEqual(fast.content, regular.content)
+
+    def test_create_recipe_duplicate_names_in_payload(self):
+        #Same name twice in one payload should only create/link it once
+        payload = {
+            'title' : 'Sample recipe name',
+            'time_minutes' : 10,
+            'price' : Decimal('2.50'),
+            'tags' : [{'name': 'Thai'}, {'name': 'Thai'}],
+            'ingredients' : [{'name': 'Rice'}, {'name': 'Rice'}],
+        }
+
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.tags.count(), 1)
+        self.assertEqual(recipe.ingredients.count(), 1)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+    def test_create_recipe_query_count_independent_of_ingredients(self):
+        #Resolving tags/ingredients is done in bulk, so more ingredients shouldn't mean more queries
+        def post_recipe(count):
+            payload = {
+                'title' : f'Recipe with {count} ingredients',
+                'time_minutes' : 10,
+                'price' : Decimal('2.50'),
+                'tags' : [{'name': f'tag{count}-{i}'} for i in range(count)],
+                'ingredients' : [{'name': f'ingr{count}-{i}'} for i in range(count)],
+            }
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.post(RECIPES_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(post_recipe(2), post_recipe(30))
+
     def test_filter_by_tags(self):
         r1 = create_recipe(user =self.user, title='Spaghetti')
         r2 = create_recipe(user =self.user, title='Lasagna')
@@ -400,6 +558,123 @@ class PrivateRecipeApiTests(TestCase):
 
 
 
+    def test_filter_by_tags_match_all(self):
+        r1 = create_recipe(user=self.user, title='Pad Thai')
+        r2 = create_recipe(user=self.user, title='Green Curry')
+        tag1 = Tag.objects.create(user=self.user, name='Thai')
+        tag2 = Tag.objects.create(user=self.user, name='Dinner')
+        r1.tags.add(tag1, tag2)
+        r2.tags.add(tag1)
+
+        params = {'tags' : f'{tag1.id},{tag2.id}', 'tags_match': 'all'}
+        res = self.client.get(RECIPES_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['id'] for r in res.data], [r1.id])
+
+    def test_filter_returns_recipe_once(self):
+        #A recipe matching several of the ids should only be listed once
+        r1 = create_recipe(user=self.user)
+        tag1 = Tag.objects.create(user=self.user, name='Thai')
+        tag2 = Tag.objects.create(user=self.user, name='Dinner')
+        r1.tags.add(tag1, tag2)
+
+        res = self.client.get(RECIPES_URL, {'tags' : f'{tag1.id},{tag2.id}'})
+
+        self.assertEqual([r['id'] for r in res.data], [r1.id])
+
+    def test_filter_invalid_ids_error(self):
+        res = self.client.get(RECIPES_URL, {'tags' : '1,abc'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_empty_ids_error(self):
+        #no ids at all would otherwise match nothing (any) or everything (all)
+        for match in ('any', 'all'):
+            for value in (',', ' ', ' , '):
+                res = self.client.get(RECIPES_URL, {'tags' : value, 'tags_match': match})
+                self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST, (match, value))
+
+    def test_filter_too_many_ids_error(self):
+        with self.settings(API_MAX_FILTER_IDS=3):
+            res = self.client.get(RECIPES_URL, {'ingredients' : '1,2,3,4'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_by_time_and_price(self):
+        quick_cheap = create_recipe(user=self.user, time_minutes=10, price=Decimal('4.00'))
+        create_recipe(user=self.user, time_minutes=60, price=Decimal('4.00'))
+        create_recipe(user=self.user, time_minutes=10, price=Decimal('12.00'))
+
+        res = self.client.get(RECIPES_URL, {'max_time': 30, 'max_price': '10'})
+
+        self.assertEqual([r['id'] for r in res.data], [quick_cheap.id])
+
+    def test_filter_range_invalid_error(self):
+        res = self.client.get(RECIPES_URL, {'min_price': 'cheap'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_range_non_finite_error(self):
+        for value in ['NaN', 'Infinity', '-inf', 'sNaN']:
+            res = self.client.get(RECIPES_URL, {'max_price': value})
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_ordering_by_price(self):
+        r1 = create_recipe(user=self.user, price=Decimal('9.00'))
+        r2 = create_recipe(user=self.user, price=Decimal('3.00'))
+        r3 = create_recipe(user=self.user, price=Decimal('3.00'))
+
+        res = self.client.get(RECIPES_URL, {'ordering': 'price'})
+        self.assertEqual([r['id'] for r in res.data], [r2.id, r3.id, r1.id])
+
+        res = self.client.get(RECIPES_URL, {'ordering': '-price'})
+        self.assertEqual([r['id'] for r in res.data], [r1.id, r3.id, r2.id])
+
+    def test_ordering_invalid_error(self):
+        res = self.client.get(RECIPES_URL, {'ordering': 'description'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_ordering_with_cursor_pagination(self):
+        recipes = [create_recipe(user=self.user, time_minutes=minutes) for minutes in [20, 5, 5, 40, 5]]
+
+        seen = []
+        res = self.client.get(RECIPES_URL, {'ordering': 'time_minutes', 'page_size': 2})
+        while True:
+            seen += [r['id'] for r in res.data['results']]
+            if not res.data['next']:
+                break
+            res = self.client.get(res.data['next'])
+
+        expected = sorted(recipes, key=lambda r: (r.time_minutes, r.id))
+        self.assertEqual(seen, [r.id for r in expected])
+
+    def test_tied_ordering_pages_seek_without_offset(self):
+        #every recipe has the same price, pages must step past the ties with (price, id), not OFFSET
+        recipes = [create_recipe(user=self.user, price=Decimal('5.00')) for n in range(7)]
+
+        seen = []
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(RECIPES_URL, {'ordering': 'price', 'page_size': 2})
+            while True:
+                seen += [r['id'] for r in res.data['results']]
+                if not res.data['next']:
+                    break
+                res = self.client.get(res.data['next'])
+
+        self.assertEqual(seen, [r.id for r in recipes])
+        self.assertFalse([q for q in ctx.captured_queries if 'OFFSET' in q['sql']])
+
+        #and back again from the last page
+        res = self.client.get(res.data['previous'])
+        self.assertEqual([r['id'] for r in res.data['results']], seen[4:6])
+
+    def test_invalid_cursor_error(self):
+        res = self.client.get(RECIPES_URL, {'cursor': 'notacursor'})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_filter_invalid_match_error(self):
+        res = self.client.get(RECIPES_URL, {'tags' : '1', 'tags_match': 'some'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
 class ImageUploadTests(TestCase):
 
     def setUp(self):
@@ -436,18 +711,227 @@ class ImageUploadTests(TestCase):
         res = self.client.post(url, payload, format='multipart')
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def _upload(self, size=(1000, 800), fmt='JPEG'):
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix=f'.{fmt.lower()}') as image_file:
+            img = Image.new('RGB', size)
+            exif = Image.Exif()
+            exif[0x010f] = 'Test camera' #Make
+            if fmt == 'JPEG':
+                img.save(image_file, format=fmt, exif=exif.tobytes())
+            else:
+                img.save(image_file, format=fmt)
+            image_file.seek(0)
+            return self.client.post(url, {'image' : image_file}, format='multipart')
+
+    def _delete_variants(self):
+        storage = Recipe._meta.get_field('image').storage
+        for path in self.recipe.image_variants.values():
+            storage.delete(path)
+
+    @override_settings(IMAGE_PROCESSING_MODE='sync')
+    def test_upload_image_generates_variants(self):
+        res = self._upload()
+        self.recipe.refresh_from_db()
+        self.addCleanup(self._delete_variants)
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res.data['image_status'], Recipe.IMAGE_READY)
+        self.assertEqual(set(res.data['image_variants']), {'thumbnail', 'medium', 'large'})
+        self.assertTrue(os.path.exists(self.recipe.image.path))
+
+        storage = Recipe._meta.get_field('image').storage
+        with storage.open(self.recipe.image_variants['thumbnail']) as f:
+            thumb = Image.open(f)
+            self.assertEqual(max(thumb.size), 150)
+            self.assertFalse(thumb.getexif()) #metadata stripped
+
+    @override_settings(IMAGE_PROCESSING_MODE='queue')
+    def test_upload_image_queued_for_worker(self):
+        res = self._upload()
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res.data['image_status'], Recipe.IMAGE_PENDING)
+
+        call_command('process_images', '--once')
+        self.recipe.refresh_from_db()
+        self.addCleanup(self._delete_variants)
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_READY)
+
+    @override_settings(IMAGE_PROCESSING_MODE='queue')
+    def test_stale_image_requeued(self):
+        #a worker died while processing, an hour ago
+        self._upload()
+        Recipe.objects.filter(id=self.recipe.id).update(
+            image_status=Recipe.IMAGE_PROCESSING, image_claimed_at=timezone.now() - timedelta(hours=1),
+        )
+
+        with override_settings(IMAGE_PROCESSING_MODE='sync'):
+            call_command('requeue_images', stdout=StringIO())
+        self.recipe.refresh_from_db()
+        self.addCleanup(self._delete_variants)
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_READY)
+
+    @override_settings(IMAGE_PROCESSING_MODE='queue')
+    def test_recent_claim_not_requeued(self):
+        self._upload()
+        Recipe.objects.filter(id=self.recipe.id).update(
+            image_status=Recipe.IMAGE_PROCESSING, image_claimed_at=timezone.now(),
+        )
+
+        call_command('requeue_images', stdout=StringIO())
+        call_command('process_images', '--once', stdout=StringIO())
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_PROCESSING)
+
+    @override_settings(IMAGE_PROCESSING_MODE='queue')
+    def test_worker_takes_stale_claim(self):
+        self._upload()
+        Recipe.objects.filter(id=self.recipe.id).update(
+            image_status=Recipe.IMAGE_PROCESSING, image_claimed_at=timezone.now() - timedelta(hours=1),
+        )
+
+        call_command('process_images', '--once', stdout=StringIO())
+        self.recipe.refresh_from_db()
+        self.addCleanup(self._delete_variants)
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_READY)
+
+    @override_settings(IMAGE_UPLOAD_MAX_SIZE=1000)
+    def test_upload_image_too_large(self):
+        res = self._upload()
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_upload_image_content_length_too_large(self):
+        url = image_upload_url(self.recipe.id)
+        res = self.client.post(
+            url, {}, format='multipart',
+            CONTENT_LENGTH=str(settings.IMAGE_UPLOAD_MAX_SIZE * 2),
+        )
+        self.assertEqual(res.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+    @override_settings(IMAGE_MAX_PIXELS=1000)
+    def test_upload_image_too_many_pixels(self):
+        #rejected from the header, before any decoding
+        with patch('PIL.ImageFile.ImageFile.load') as patched_load:
+            res = self._upload(size=(100, 100))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        patched_load.assert_not_called()
 
+    def test_upload_image_unsupported_format(self):
+        res = self._upload(fmt='BMP')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
 
+IMPORT_URL = reverse('recipe:recipe-import-recipes')
 
+class RecipeImportTests(TestCase):
+    #Tests for the bulk import endpoint and command
 
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='testpass')
+        self.client.force_authenticate(self.user)
 
+    def test_import_ndjson(self):
+        Tag.objects.create(user=self.user, name='Dinner')
+        body = '\n'.join([
+            json.dumps({'title': 'Curry', 'time_minutes': 30, 'price': '7.00',
+                        'tags': [{'name': 'Dinner'}, {'name': 'Thai'}],
+                        'ingredients': [{'name': 'Rice'}]}),
+            json.dumps({'title': 'Soup', 'time_minutes': 10, 'price': '3.50',
+                        'description': 'Hot', 'tags': [{'name': 'Thai'}]}),
+        ])
 
+        res = self.client.post(IMPORT_URL, body, content_type='application/x-ndjson')
 
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'created': 2, 'errors': []})
+        curry = Recipe.objects.get(user=self.user, title='Curry')
+        self.assertEqual(sorted(t.name for t in curry.tags.all()), ['Dinner', 'Thai'])
+        self.assertEqual([i.name for i in curry.ingredients.all()], ['Rice'])
+        self.assertEqual(Recipe.objects.get(title='Soup').description, 'Hot')
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_import_reports_bad_rows(self):
+        body = '\n'.join([
+            json.dumps({'title': 'Curry', 'time_minutes': 30, 'price': '7.00'}),
+            json.dumps({'title': 'No price', 'time_minutes': 30}),
+            'not json',
+            json.dumps({'title': 'Soup', 'time_minutes': 10, 'price': '3.50'}),
+        ])
+
+        res = self.client.post(IMPORT_URL, body, content_type='application/x-ndjson')
 
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['created'], 2)
+        self.assertEqual([e['row'] for e in res.data['errors']], [2, 3])
+        self.assertIn('price', res.data['errors'][0]['errors'])
+
+    def test_import_csv(self):
+        body = (
+            'title,time_minutes,price,tags,ingredients\n'
+            'Curry,30,7.00,Dinner|Thai,Rice\n'
+            'Soup,10,3.50,,\n'
+        )
 
+        res = self.client.post(IMPORT_URL, body, content_type='text/csv')
 
+        self.assertEqual(res.data, {'created': 2, 'errors': []})
+        curry = Recipe.objects.get(user=self.user, title='Curry')
+        self.assertEqual(curry.tags.count(), 2)
 
+    def test_import_ndjson_bad_encoding(self):
+        body = (
+            json.dumps({'title': 'Curry', 'time_minutes': 30, 'price': '7.00'}).encode() + b'\n'
+            + b'{"title": "Caf\xe9"}\n'
+            + json.dumps({'title': 'Soup', 'time_minutes': 10, 'price': '3.50'}).encode() + b'\n'
+        )
+
+        res = self.client.post(IMPORT_URL, body, content_type='application/x-ndjson')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['created'], 2)
+        self.assertEqual(res.data['errors'], [{'row': 2, 'errors': {'non_field_errors': ['Invalid UTF-8.']}}])
+
+    def test_import_csv_bad_lines(self):
+        body = (
+            b'title,time_minutes,price\n'
+            b'Curry,30,7.00\n'
+            b'Caf\xe9,5,1.00\n'
+            b'So\rup,10,3.50\n' #stray carriage return, csv.Error
+            b'Pie,5,1.00\n'
+        )
+
+        res = self.client.post(IMPORT_URL, body, content_type='text/csv')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['created'], 2)
+        self.assertEqual([e['row'] for e in res.data['errors']], [3, 4])
+        self.assertIn('Invalid UTF-8.', res.data['errors'][0]['errors']['non_field_errors'][0])
+        self.assertIn('Invalid CSV', res.data['errors'][1]['errors']['non_field_errors'][0])
+
+    def test_import_json_list(self):
+        payload = [{'title': 'Curry', 'time_minutes': 30, 'price': '7.00'}]
+
+        res = self.client.post(IMPORT_URL, payload, format='json')
+
+        self.assertEqual(res.data, {'created': 1, 'errors': []})
+        self.assertTrue(Recipe.objects.filter(user=self.user, title='Curry').exists())
+
+    def test_import_invalidates_list_cache(self):
+        self.client.get(RECIPES_URL)
+        body = json.dumps({'title': 'Curry', 'time_minutes': 30, 'price': '7.00'})
+
+        self.client.post(IMPORT_URL, body, content_type='application/x-ndjson')
+        res = self.client.get(RECIPES_URL)
 
+        self.assertEqual(len(res.data), 1)
 
+    def test_import_recipes_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson') as f:
+            f.write(json.dumps({'title': 'Curry', 'time_minutes': 30, 'price': '7.00'}) + '\n')
+            f.flush()
+            call_command('import_recipes', f.name, user=self.user.email, stdout=StringIO())
 
+        self.assertTrue(Recipe.objects.filter(user=self.user, title='Curry').exists())
@@ -0,0 +1,79 @@
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Recipe, Tag, Ingredient
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def create_recipe(user, **params):
+    defaults = {
+        'title' : 'Sample recipe name',
+        'time_minutes' : 5,
+        'price' : Decimal('5.50'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+class RecipeSearchTests(TestCase):
+    #Tests for ?search= on the recipe list
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('user@example.com', 'testpass')
+        self.client.force_authenticate(self.user)
+
+    def search(self, term):
+        res = self.client.get(RECIPES_URL, {'search': term})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [r['id'] for r in res.data]
+
+    def test_search_title_and_description(self):
+        r1 = create_recipe(user=self.user, title='Chicken curry')
+        r2 = create_recipe(user=self.user, title='Stew', description='Slow cooked chicken')
+        create_recipe(user=self.user, title='Salad')
+
+        self.assertEqual(self.search('chicken'), [r1.id, r2.id]) #title outranks description
+
+    def test_search_tag_and_ingredient_names(self):
+        r1 = create_recipe(user=self.user, title='Pad see ew')
+        r2 = create_recipe(user=self.user, title='Stir fry')
+        r1.tags.add(Tag.objects.create(user=self.user, name='Thai'))
+        r2.ingredients.add(Ingredient.objects.create(user=self.user, name='Noodles'))
+
+        self.assertEqual(self.search('thai'), [r1.id])
+        self.assertEqual(self.search('noodles'), [r2.id])
+
+    def test_search_updates_on_tag_rename_and_removal(self):
+        recipe = create_recipe(user=self.user, title='Pad see ew')
+        tag = Tag.objects.create(user=self.user, name='Thai')
+        recipe.tags.add(tag)
+
+        tag.name = 'Lao'
+        tag.save()
+        self.assertEqual(self.search('thai'), [])
+        self.assertEqual(self.search('lao'), [recipe.id])
+
+        recipe.tags.remove(tag)
+        self.assertEqual(self.search('lao'), [])
+
+    def test_search_typo_matches_title(self):
+        recipe = create_recipe(user=self.user, title='Spaghetti bolognese')
+
+        self.assertEqual(self.search('spagetti bolognese'), [recipe.id])
+
+    def test_search_limited_to_user(self):
+        other_user = get_user_model().objects.create_user('other@example.com', 'testpass')
+        create_recipe(user=other_user, title='Chicken curry')
+
+        self.assertEqual(self.search('chicken'), [])
+
+    def test_search_not_cursor_paginated(self):
+        create_recipe(user=self.user, title='Chicken curry')
+
+        res = self.client.get(RECIPES_URL, {'search': 'chicken', 'page_size': 10})
+
+        self.assertIsInstance(res.data, list)
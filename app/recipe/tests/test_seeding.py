@@ -0,0 +1,124 @@
+import itertools
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from core.models import Recipe, Tag, Ingredient
+from recipe.seeding import Seeder, distribution
+
+
+class SeederTests(TestCase):
+
+    def test_seed_user(self):
+        seeder = Seeder(seed=1, chunk_size=7)
+        user = seeder.create_users(2)[0]
+
+        tags, ingredients, recipe_ids = seeder.seed_user(
+            user, 20, 10, 15, tags_per_recipe=2, ingredients_per_recipe=(1, 3),
+        )
+
+        self.assertEqual(Tag.objects.filter(user=user).count(), 10)
+        self.assertEqual(Ingredient.objects.filter(user=user).count(), 15)
+        self.assertEqual(len(recipe_ids), 20)
+        for recipe in Recipe.objects.filter(id__in=recipe_ids):
+            self.assertEqual(recipe.tags.count(), 2)
+            self.assertEqual(recipe.ingredients.count(), recipe.ingredient_count)
+            self.assertIn(recipe.ingredient_count, [1, 2, 3])
+            self.assertIsNotNone(recipe.search_vector)
+
+    def test_same_seed_same_data(self):
+        def titles(seed, email):
+            seeder = Seeder(seed=seed)
+            user = seeder.create_users(1, email=email)[0]
+            seeder.seed_user(user, 10, 5, 5)
+            return list(Recipe.objects.filter(user=user).order_by('id').values_list('title', 'time_minutes', 'price'))
+
+        self.assertEqual(titles(3, 'a-{n}@example.com'), titles(3, 'b-{n}@example.com'))
+
+    def test_shared_password(self):
+        users = Seeder().create_users(3, password='secret-pass')
+        self.assertTrue(all(user.check_password('secret-pass') for user in users))
+
+    def test_distribution(self):
+        seeder = Seeder()
+        self.assertEqual(seeder.pick_count('5'), 5)
+        self.assertIn(seeder.pick_count('2-4'), [2, 3, 4])
+        #exponential counts are capped
+        self.assertTrue(all(seeder.pick_count('exp:50:60') <= 60 for _ in range(100)))
+
+        for spec in ['', 'many', '1-x', 'exp:', 'exp:x']:
+            with self.assertRaises(ValueError):
+                distribution(spec)
+
+
+class SeedDataCommandTests(TestCase):
+
+    def seed_data(self, **options):
+        call_command(
+            'seed_data', users=5, recipes_per_user='2-4', tags_per_user='3', ingredients_per_user='4',
+            ingredients_per_recipe='1-3', chunk_size=2, stdout=StringIO(), **options,
+        )
+        return get_user_model().objects.filter(email__startswith='seed-')
+
+    def check_seeded(self, users):
+        self.assertEqual(users.count(), 5)
+        self.assertEqual(Tag.objects.filter(user__in=users).count(), 15)
+        self.assertEqual(Ingredient.objects.filter(user__in=users).count(), 20)
+        for user in users:
+            self.assertIn(user.recipe_set.count(), [2, 3, 4])
+        for recipe in Recipe.objects.filter(user__in=users):
+            self.assertEqual(recipe.ingredients.count(), recipe.ingredient_count)
+            self.assertIsNotNone(recipe.search_vector)
+
+    def test_seed_data_copy(self):
+        self.check_seeded(self.seed_data())
+
+    def test_seed_data_bulk_create(self):
+        self.check_seeded(self.seed_data(no_copy=True))
+
+    def test_continue_with_start(self):
+        self.seed_data()
+        users = self.seed_data(start=5)
+        self.assertEqual(users.count(), 10)
+
+    def test_invalid_count(self):
+        with self.assertRaises(CommandError):
+            self.seed_data(tags_per_recipe='lots')
+
+
+class BenchmarkCommandTests(TestCase):
+
+    def run_benchmark(self, budgets):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'budgets.json'
+            path.write_text(json.dumps(budgets))
+            out = StringIO()
+            call_command(
+                'benchmark_api', recipes=20, tags=5, ingredients=8, iterations=2, warmup=0,
+                budgets=str(path), queries_only=True, stdout=out,
+            )
+            return out.getvalue()
+
+    def test_within_budget(self):
+        out = self.run_benchmark({'list': {'queries': 100, 'p95_ms': 1}})
+
+        self.assertIn('list', out)
+        self.assertIn('token', out)
+        self.assertFalse(Recipe.objects.exists()) #seeded data rolled back
+
+    def test_query_counts_independent_of_token_cache_expiry(self):
+        #the clock moves 30s on every look at it, so cached tokens keep expiring during the run
+        with patch('user.authentication.time.monotonic', side_effect=itertools.count(0, 30)):
+            out = self.run_benchmark({'list': {'queries': 3, 'p95_ms': 1}, 'detail': {'queries': 3, 'p95_ms': 1}})
+
+        self.assertIn('list', out)
+
+    def test_query_budget_exceeded(self):
+        with self.assertRaises(CommandError):
+            self.run_benchmark({'detail': {'queries': 0, 'p95_ms': 1000}})
@@ -1,6 +1,8 @@
 from decimal import Decimal
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -72,6 +74,17 @@ class PrivateTagsApiTests(TestCase):
         tag.refresh_from_db()
         self.assertEqual(tag.name, payload['name'])
 
+    def test_update_tag_duplicate_name_error(self):
+        Tag.objects.create(user=self.user, name='Dinner')
+        tag = Tag.objects.create(user=self.user, name='Dessert')
+
+        url = detail_url(tag.id)
+        res = self.client.patch(url, {'name': 'Dinner'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'Dessert')
+
     def test_delete_recipe(self):
         tag = Tag.objects.create(user=self.user, name='Breakfast')
         url = detail_url(tag.id)
@@ -118,4 +131,78 @@ class PrivateTagsApiTests(TestCase):
         r2.tags.add(tag)
 
         res = self.client.get(TAGS_URL, {'assigned_only' : 1})
-        self.assertEqual(len(res.data), 1)
\ No newline at end of file
+        self.assertEqual(len(res.data), 1)
+
+    def test_tags_cursor_pagination(self):
+        for name in ['Breakfast', 'Dinner', 'Lunch', 'Vegan']:
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {'page_size': 3})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        names = [t['name'] for t in res.data['results']]
+        res = self.client.get(res.data['next'])
+        names += [t['name'] for t in res.data['results']]
+
+        self.assertEqual(names, ['Vegan', 'Lunch', 'Dinner', 'Breakfast'])
+        self.assertIsNone(res.data['next'])
+
+    def test_tags_usage_pages_seek_without_offset(self):
+        tags = [Tag.objects.create(user=self.user, name=name) for name in ['A', 'B', 'C', 'D', 'E']]
+        recipe = Recipe.objects.create(title='Porridge', time_minutes=5, price=Decimal('4.50'), user=self.user)
+        recipe.tags.add(tags[0], tags[2])
+
+        names = []
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(TAGS_URL, {'ordering': 'usage', 'page_size': 2})
+            while True:
+                names += [t['name'] for t in res.data['results']]
+                if not res.data['next']:
+                    break
+                res = self.client.get(res.data['next'])
+
+        #most used first, then reverse name order
+        self.assertEqual(names, ['C', 'A', 'E', 'D', 'B'])
+        self.assertFalse([q for q in ctx.captured_queries if 'OFFSET' in q['sql']])
+
+    def test_tags_with_counts(self):
+        tag1 = Tag.objects.create(user=self.user, name='Breakfast')
+        tag2 = Tag.objects.create(user=self.user, name='Vegan')
+        for title in ['Porridge', 'Toast']:
+            recipe = Recipe.objects.create(
+                title=title, time_minutes=5, price=Decimal('4.50'), user=self.user,
+            )
+            recipe.tags.add(tag1)
+
+        res = self.client.get(TAGS_URL, {'with_counts': 1})
+
+        self.assertEqual(res.data, [
+            {'id': tag2.id, 'name': 'Vegan', 'recipe_count': 0},
+            {'id': tag1.id, 'name': 'Breakfast', 'recipe_count': 2},
+        ])
+
+    def test_tags_ordered_by_usage(self):
+        tag1 = Tag.objects.create(user=self.user, name='Breakfast')
+        tag2 = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = Recipe.objects.create(
+            title='Porridge', time_minutes=5, price=Decimal('4.50'), user=self.user,
+        )
+        recipe.tags.add(tag1)
+
+        res = self.client.get(TAGS_URL, {'ordering': 'usage'})
+
+        self.assertEqual([t['id'] for t in res.data], [tag1.id, tag2.id])
+        self.assertEqual(res.data[0]['recipe_count'], 1)
+
+    def test_tags_with_counts_query_count_constant(self):
+        #counts come from one aggregate query, not a query per tag
+        def list_queries():
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.get(TAGS_URL, {'with_counts': 1})
+            return len(ctx.captured_queries)
+
+        Tag.objects.create(user=self.user, name='Tag0')
+        small = list_queries()
+        for n in range(1, 10):
+            Tag.objects.create(user=self.user, name=f'Tag{n}')
+
+        self.assertEqual(list_queries(), small)
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+
+
+class MaxSizeUploadHandler(FileUploadHandler):
+    #Stops reading an upload as soon as a file goes over IMAGE_UPLOAD_MAX_SIZE.
+    #Runs before the memory/temp-file handlers so oversized chunks never reach them; chunked or
+    #mislabelled requests are covered too, not just ones with an honest Content-Length.
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.IMAGE_UPLOAD_MAX_SIZE:
+            raise StopUpload(connection_reset=False) #drops the file, the serializer then reports it missing
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None #let the next handler build the file
@@ -4,16 +4,30 @@ from drf_spectacular.utils import (
     OpenApiParameter,
     OpenApiTypes,
 )
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Exists, OuterRef, Prefetch
 from rest_framework import viewsets, mixins, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from core.models import Recipe, Tag, Ingredient
+from core.parsers import FastJSONParser
+from user.authentication import CachedTokenAuthentication
 from recipe import serializers
+from recipe.cache import CachedListMixin, etag_matches, make_etag, not_modified
+from recipe.fast_list import FastRecipeListMixin
+from recipe.filters import filter_recipes, get_ordering, params_to_ints
+from recipe.images import enqueue_image_processing
+from recipe.importer import CSVParser, NDJSONParser, RecipeImporter
+from recipe.pagination import UNPAGINATED_DESCRIPTION, KeysetPagination
+from recipe.pantry import match_recipes
+from recipe.replica import ReplicaReadMixin
 
 @extend_schema_view(
     list=extend_schema(
+        description=UNPAGINATED_DESCRIPTION,
         parameters=[OpenApiParameter(
             'tags',
             OpenApiTypes.STR,
@@ -23,84 +37,267 @@ from recipe import serializers
             'ingredients',
             OpenApiTypes.STR,
             description='List of ids to filter',
-            )
+            ),
+            OpenApiParameter(
+            'tags_match',
+            OpenApiTypes.STR,
+            enum=['any', 'all'],
+            description='Match recipes with any (default) or all of the tags',
+            ),
+            OpenApiParameter(
+            'ingredients_match',
+            OpenApiTypes.STR,
+            enum=['any', 'all'],
+            description='Match recipes with any (default) or all of the ingredients',
+            ),
+            OpenApiParameter(
+            'search',
+            OpenApiTypes.STR,
+            description='Search title, description, tag and ingredient names, best matches first',
+            ),
+            OpenApiParameter('min_time', OpenApiTypes.INT, description='Minimum time in minutes'),
+            OpenApiParameter('max_time', OpenApiTypes.INT, description='Maximum time in minutes'),
+            OpenApiParameter('min_price', OpenApiTypes.DECIMAL, description='Minimum price'),
+            OpenApiParameter('max_price', OpenApiTypes.DECIMAL, description='Maximum price'),
+            OpenApiParameter(
+            'ordering',
+            OpenApiTypes.STR,
+            enum=['-id', 'id', 'time_minutes', '-time_minutes', 'price', '-price'],
+            description='Sort order, newest first (-id) by default',
+            ),
         ]))
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ReplicaReadMixin, CachedListMixin, FastRecipeListMixin, viewsets.ModelViewSet):
     #View for manage recipe apis
     serializer_class = serializers.RecipeDetailSerializer
     queryset = Recipe.objects.all() #objects available for this viewset (DOM objects?)
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes =[IsAuthenticated]
+    pagination_class = KeysetPagination
 
-    def _params_to_ints(self, qs):
-        return [int(str_id) for str_id in qs.split(',')]
+    @property
+    def cursor_ordering(self):
+        #same ordering as get_queryset; ranked search results aren't cursor paginated (capped at SEARCH_MAX_RESULTS instead)
+        ordering = get_ordering(self.request.query_params)
+        return None if '-rank' in ordering else ordering
 
     def get_queryset(self):
         #instead of returning all objects defined, filter by authenticated user
-        tags = self.request.query_params.get('tags')
-        ingredients = self.request.query_params.get('ingredients')
-        queryset = self.queryset
-        if tags:
-            tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
-        if ingredients:
-            ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
-
-        return queryset.filter(user=self.request.user).order_by('-id').distinct()
+        params = self.request.query_params
+        queryset = filter_recipes(self.queryset, params)
+        queryset = queryset.filter(user=self.request.user).order_by(*get_ordering(params))
+        queryset = self._plan_queryset(queryset)
+        if self.action == 'list' and self.cursor_ordering is None:
+            queryset = queryset[:settings.SEARCH_MAX_RESULTS]
+        return queryset
+
+    def _plan_queryset(self, queryset):
+        #Load only what the serializer for this action will render
+        #list/retrieve render nested tags & ingredients, so prefetch them (2 queries total instead of 2 per recipe)
+        if self.action not in ('list', 'retrieve'):
+            return queryset
+
+        serializer_class = self.get_serializer_class()
+        m2m_fields = [f.name for f in Recipe._meta.many_to_many]
+        columns = [f for f in serializer_class.Meta.fields if f not in m2m_fields]
+        if self.use_fast_list():
+            return queryset.values(*columns) #serialize_recipe_list fetches the nested items itself
+
+        return queryset.only('user', *columns).prefetch_related(*[
+            Prefetch(f, queryset=Recipe._meta.get_field(f).related_model.objects.order_by('id'))
+            for f in serializer_class.Meta.fields if f in m2m_fields
+        ])
 
     def get_serializer_class(self):
         #Return serializer class for request
 
         if self.action == 'list':
             return serializers.RecipeSerializer
-        elif self.action == 'upload-image':
+        elif self.action == 'upload_image':
             return serializers.RecipeImageSerializer
 
         return self.serializer_class
 
+    def retrieve(self, request, *args, **kwargs):
+        #Strong ETag over the serialized recipe, so a client re-fetching an unchanged recipe gets a bodiless 304
+        serializer = self.get_serializer(self.get_object())
+        etag = make_etag(serializer.data)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        response = Response(serializer.data)
+        response['ETag'] = etag
+        return response
+
     def perform_create(self, serializer): #overriding django rest_framework method
         serializer.save(user=self.request.user)
 
     #must apply this action to a specific recipe
     @action(methods=['POST'], detail=True, url_path='upload-image' )
     def upload_image(self, request, pk=None):
+        #Store the upload and return straight away, resizing happens in the background (recipe/images.py)
+        #Refuse obviously oversized bodies before reading them (64KiB allowance for the multipart envelope)
+        content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        if content_length > settings.IMAGE_UPLOAD_MAX_SIZE + 64 * 1024:
+            return Response(
+                {'image': [f'Image is larger than {settings.IMAGE_UPLOAD_MAX_SIZE} bytes.']},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+
         recipe = self.get_object()
         serializer = self.get_serializer(recipe, data=request.data)
 
         if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            recipe = serializer.save()
+            enqueue_image_processing(recipe)
+            return Response(self.get_serializer(recipe).data, status=status.HTTP_202_ACCEPTED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter('ingredients', OpenApiTypes.STR, required=True,
+                             description='Comma separated ids of the ingredients you have'),
+            OpenApiParameter('limit', OpenApiTypes.INT, description='Number of recipes to return'),
+        ],
+        responses=serializers.RecipeMatchSerializer(many=True),
+    )
+    @action(methods=['GET'], detail=False, url_path='pantry')
+    def pantry(self, request):
+        #"What can I cook": recipes ranked by how many of their ingredients are in the given set
+        value = request.query_params.get('ingredients')
+        if not value:
+            raise ValidationError({'ingredients': 'This query parameter is required.'})
+        ingredient_ids = params_to_ints(value, 'ingredients')
+
+        try:
+            limit = int(request.query_params.get('limit', settings.API_PAGE_SIZE))
+            limit = max(1, min(limit, settings.API_MAX_PAGE_SIZE))
+        except ValueError:
+            raise ValidationError({'limit': 'Must be an integer.'})
+
+        recipes = match_recipes(request.user, ingredient_ids, limit)
+        serializer = serializers.RecipeMatchSerializer(recipes, many=True, context=self.get_serializer_context())
+        return Response(serializer.data)
+
+    @extend_schema(
+        request={
+            'application/x-ndjson': OpenApiTypes.STR,
+            'text/csv': OpenApiTypes.STR,
+            'application/json': serializers.RecipeDetailSerializer(many=True),
+        },
+        responses=OpenApiTypes.OBJECT,
+    )
+    @action(methods=['POST'], detail=False, url_path='import',
+            parser_classes=[NDJSONParser, CSVParser, FastJSONParser])
+    def import_recipes(self, request):
+        #Bulk create recipes from an NDJSON/CSV stream or a JSON list, returns created count + per-row errors
+        rows = request.data
+        if isinstance(rows, list):
+            rows = enumerate(rows, 1)
+        elif isinstance(rows, dict): #a JSON object, or an empty body
+            if rows:
+                raise ValidationError('Expected a list of recipes.')
+            rows = []
+
+        importer = RecipeImporter(request.user, chunk_size=settings.IMPORT_CHUNK_SIZE)
+        result = importer.run(rows)
+        return Response(result, status=status.HTTP_200_OK)
+
+
 #using viewset bc Create Read Update Delete on a model - has to be generic so we can add the mixin
-class TagViewSet(mixins.DestroyModelMixin, mixins.UpdateModelMixin,
-                 mixins.ListModelMixin, viewsets.GenericViewSet):
-    #Manage tags in the db
-    serializer_class = serializers.TagSerializer
-    queryset = Tag.objects.all()
-    authentication_classes = [TokenAuthentication]
+@extend_schema_view(
+    list=extend_schema(
+        description=UNPAGINATED_DESCRIPTION,
+        parameters=[
+            OpenApiParameter(
+                'assigned_only',
+                OpenApiTypes.INT, enum=[0, 1],
+                description='Filter by items assigned to recipes',
+            ),
+            OpenApiParameter(
+                'with_counts',
+                OpenApiTypes.INT, enum=[0, 1],
+                description='Include recipe_count, the number of recipes using each item',
+            ),
+            OpenApiParameter(
+                'ordering',
+                OpenApiTypes.STR, enum=['-name', 'usage'],
+                description='Reverse name order (default) or most used first',
+            ),
+        ]))
+class BaseRecipeAttrViewSet(ReplicaReadMixin, CachedListMixin, mixins.DestroyModelMixin, mixins.UpdateModelMixin,
+                            mixins.ListModelMixin, viewsets.GenericViewSet):
+    #Shared behaviour for tags and ingredients
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+
+    def _flag(self, name):
+        try:
+            return bool(int(self.request.query_params.get(name, 0)))
+        except ValueError:
+            raise ValidationError({name: 'Must be 0 or 1.'})
+
+    def _ordering(self):
+        ordering = self.request.query_params.get('ordering', '-name')
+        if ordering not in ('-name', 'usage'):
+            raise ValidationError({'ordering': "Must be '-name' or 'usage'."})
+        return ordering
 
-    #only want to return tags associated with authenticated user.
+    def _with_counts(self):
+        return self.action == 'list' and (self._flag('with_counts') or self._ordering() == 'usage')
+
+    @property
+    def cursor_ordering(self):
+        #same ordering as get_queryset, id breaks ties
+        if self._ordering() == 'usage':
+            return ('-recipe_count', '-name', '-id')
+        return ('-name', '-id')
+
+    #only want to return objects associated with authenticated user.
     def get_queryset(self):
         #instead of returning all objects defined, filter by authenticated user
-        return self.queryset.filter(user=self.request.user).order_by('-name')
+        queryset = self.queryset.filter(user=self.request.user)
+
+        if self.action == 'list' and self._flag('assigned_only'):
+            #EXISTS, so an item used by several recipes is still listed once
+            through = Recipe._meta.get_field(self.recipe_field).remote_field.through
+            fk_name = Recipe._meta.get_field(self.recipe_field).m2m_reverse_name()
+            queryset = queryset.filter(Exists(through.objects.filter(**{fk_name: OuterRef('pk')})))
+
+        if self._with_counts():
+            #one GROUP BY over the through table instead of a count query per row
+            queryset = queryset.annotate(recipe_count=Count('recipe'))
+            if self._ordering() == 'usage':
+                return queryset.order_by('-recipe_count', '-name')
+
+        return queryset.order_by('-name')
                 #reverse name order
 
+    def get_serializer_class(self):
+        if self._with_counts():
+            return self.usage_serializer_class
+        return self.serializer_class
+
     #mixin.UpdateModelMixin - automatically updates model for you apparently so we don't have to write a method for it.
 
-class IngredientViewSet(mixins.DestroyModelMixin, mixins.UpdateModelMixin,
-                 mixins.ListModelMixin, viewsets.GenericViewSet):
+    def perform_update(self, serializer):
+        #names are unique per user, renaming onto an existing name is a 400 not a 500
+        try:
+            with transaction.atomic():
+                serializer.save()
+        except IntegrityError:
+            raise ValidationError({'name': 'You already have one with this name.'})
+
+class TagViewSet(BaseRecipeAttrViewSet):
     #Manage tags in the db
+    serializer_class = serializers.TagSerializer
+    usage_serializer_class = serializers.TagUsageSerializer
+    queryset = Tag.objects.all()
+    recipe_field = 'tags'
+
+class IngredientViewSet(BaseRecipeAttrViewSet):
+    #Manage ingredients in the db
     serializer_class = serializers.IngredientSerializer
+    usage_serializer_class = serializers.IngredientUsageSerializer
     queryset = Ingredient.objects.all()
-    authentication_classes = [TokenAuthentication]
-    permission_classes = [IsAuthenticated]
-
-    #only want to return tags associated with authenticated user.
-    def get_queryset(self):
-        #instead of returning all objects defined, filter by authenticated user
-        return self.queryset.filter(user=self.request.user).order_by('-name')
-                #reverse name order
+    recipe_field = 'ingredients'
@@ -0,0 +1,113 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from drf_spectacular.authentication import TokenScheme
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+
+class TokenCache:
+    #Bounded, thread-safe LRU of token key -> Token (with its user) whose entries expire after ttl seconds.
+    #Per process, so the ttl is also the most a deleted token/deactivated user can stay valid on another worker.
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict() #key -> (expires_at, token)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, token):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, token)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate_key(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for key in [k for k, (_, token) in self._entries.items() if token.user_id == user_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+
+token_cache = TokenCache(settings.TOKEN_CACHE_SIZE, settings.TOKEN_CACHE_TTL)
+
+
+def _revocations():
+    return caches[settings.TOKEN_REVOCATION_CACHE_ALIAS]
+
+def _revoked_key(user_id):
+    return f'auth-revoked:{user_id}'
+
+def revoke_cached_tokens(user_id):
+    #Drop the user's cached tokens here and, by noting the time in the shared cache, on every other worker.
+    #The note only has to outlive the tokens cached before it, so it expires with them.
+    token_cache.invalidate_user(user_id)
+    _revocations().set(_revoked_key(user_id), time.time(), settings.TOKEN_CACHE_TTL)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    #TokenAuthentication for the expiring core.models.AuthToken that skips the Token -> User query for
+    #recently seen tokens. The expiry is checked on the (cached) token itself, so that costs no query either.
+    #A hit costs one lookup in TOKEN_REVOCATION_CACHE_ALIAS instead: when the user's tokens were revoked since
+    #the token was cached (revoke_cached_tokens) it's read from the database again.
+
+    def get_model(self):
+        from core.models import AuthToken
+        return AuthToken
+
+    def authenticate_credentials(self, key):
+        token = token_cache.get(key)
+        if token is not None:
+            revoked = _revocations().get(_revoked_key(token.user_id))
+            if revoked is not None and revoked >= token.cached_at:
+                token_cache.invalidate_key(key)
+                token = None
+        if token is None:
+            cached_at = time.time() #taken before the query, so a revocation during it isn't missed
+            user, token = super().authenticate_credentials(key) #raises AuthenticationFailed for bad/inactive
+            token.cached_at = cached_at
+            token_cache.set(key, token)
+        if token.is_expired():
+            raise exceptions.AuthenticationFailed(_('Token has expired.'))
+
+        #hand out copies so a view changing request.user doesn't change the cached one
+        token = copy.copy(token)
+        token.user = copy.copy(token.user)
+        return (token.user, token)
+
+
+class CachedTokenScheme(TokenScheme):
+    #Same OpenAPI security scheme as TokenAuthentication
+    target_class = 'user.authentication.CachedTokenAuthentication'
@@ -0,0 +1,105 @@
+"""
+Password hashers with their work factors taken from settings (PASSWORD_HASHER and PASSWORD_* in app/settings.py).
+
+Django rehashes a password on the next successful login when it was stored with another algorithm or with
+other work factors than the first hasher in PASSWORD_HASHERS (`must_update`), so changing either here
+upgrades users as they log in.
+Hashing is what login and signup spend most of their CPU on, and argon2 also allocates its memory_cost per
+hash: at most PASSWORD_HASH_CONCURRENCY hashes run at once per process, the other request threads wait.
+
+Under ASGI Django 3.2 runs every sync view of a worker in one shared thread, so a hash there holds up all the
+worker's other requests. With PASSWORD_HASH_OFFLOAD the login and signup views (wrapped with `offload_hashing`
+in user/urls.py) run in a pool of PASSWORD_HASH_CONCURRENCY threads instead and the event loop waits on them.
+"""
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.db import close_old_connections
+
+
+_limit = threading.BoundedSemaphore(settings.PASSWORD_HASH_CONCURRENCY)
+_local = threading.local()
+
+
+@contextmanager
+def bounded():
+    #Hold one of the PASSWORD_HASH_CONCURRENCY slots. Reentrant, verify() calls encode() for pbkdf2/bcrypt.
+    if getattr(_local, 'held', False):
+        yield
+        return
+    with _limit:
+        _local.held = True
+        try:
+            yield
+        finally:
+            _local.held = False
+
+
+class BoundedHasherMixin:
+    #Keeps a login spike from running every hash at once in every request thread
+
+    def encode(self, *args, **kwargs):
+        with bounded():
+            return super().encode(*args, **kwargs)
+
+    def verify(self, *args, **kwargs):
+        with bounded():
+            return super().verify(*args, **kwargs)
+
+
+class Argon2PasswordHasher(BoundedHasherMixin, hashers.Argon2PasswordHasher):
+    time_cost = settings.PASSWORD_ARGON2_TIME_COST
+    memory_cost = settings.PASSWORD_ARGON2_MEMORY_COST #KiB
+    parallelism = settings.PASSWORD_ARGON2_PARALLELISM
+
+
+class BCryptSHA256PasswordHasher(BoundedHasherMixin, hashers.BCryptSHA256PasswordHasher):
+    rounds = settings.PASSWORD_BCRYPT_ROUNDS
+
+
+class PBKDF2PasswordHasher(BoundedHasherMixin, hashers.PBKDF2PasswordHasher):
+    iterations = settings.PASSWORD_PBKDF2_ITERATIONS
+
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.PASSWORD_HASH_CONCURRENCY,
+            thread_name_prefix='password-hashing',
+        )
+    return _executor
+
+
+def _run_view(view, request, *args, **kwargs):
+    #Pool threads keep their own db connection, closed/reused by CONN_MAX_AGE like a request thread's
+    close_old_connections()
+    try:
+        return view(request, *args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+def offload_hashing(view):
+    #With PASSWORD_HASH_OFFLOAD (on by default with SERVER_MODE=asgi) turn a sync view that hashes passwords
+    #into an async one running it in the hashing pool, so the worker's shared sync thread stays free.
+    #Without it (WSGI) the view is returned unchanged, each request already has its own thread there.
+    if not settings.PASSWORD_HASH_OFFLOAD:
+        return view
+
+    @functools.wraps(view) #keeps csrf_exempt and the DRF view class for the schema
+    async def async_view(request, *args, **kwargs):
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            _get_executor(), functools.partial(context.run, _run_view, view, request, *args, **kwargs),
+        )
+    return async_view
@@ -1,6 +1,7 @@
 from urllib import request
 from django.contrib.auth import get_user_model, authenticate
 from rest_framework import serializers
+from core.models import AuthToken
 from django.utils.translation import gettext as _
 
 # Serializers allow complex data such as querysets and model instances to be converted to native Python datatypes that can then be easily rendered into JSON, XML or other content types. Serializers also provide deserialization, allowing parsed data to be converted back into complex types, after first validating the incoming data.
@@ -58,3 +59,13 @@ class AuthTokenSerializer(serializers.Serializer):
         attrs['user'] = is_user
         return attrs
 
+
+class TokenSerializer(serializers.ModelSerializer):
+    #The issued token and when it stops working
+
+    token = serializers.CharField(source='key', read_only=True)
+
+    class Meta:
+        model = AuthToken
+        fields = ['token', 'expires']
+        read_only_fields = ['expires']
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from core.models import AuthToken
+from user.authentication import revoke_cached_tokens, token_cache
+
+
+@receiver(post_delete, sender=AuthToken)
+def forget_deleted_token(sender, instance, **kwargs):
+    if instance.is_expired():
+        #already refused from any cache, e.g. the purge_tokens command, no need to tell the other workers
+        token_cache.invalidate_key(instance.key)
+    else:
+        revoke_cached_tokens(instance.user_id)
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def forget_user_tokens(sender, instance, **kwargs):
+    #covers deactivation and keeps the cached user from going stale
+    revoke_cached_tokens(instance.pk)
@@ -0,0 +1,117 @@
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from core.models import AuthToken
+from rest_framework.test import APIClient
+from user.authentication import TokenCache, token_cache
+
+ME_URL = reverse('user:me')
+
+
+class TokenCacheTests(SimpleTestCase):
+    #Tests for the LRU/TTL cache itself
+
+    def test_lru_eviction(self):
+        cache = TokenCache(maxsize=2, ttl=60)
+        cache.set('a', 'token-a')
+        cache.set('b', 'token-b')
+        cache.get('a') #a is now most recently used
+        cache.set('c', 'token-c')
+
+        self.assertEqual(cache.get('a'), 'token-a')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 'token-c')
+
+    @patch('user.authentication.time.monotonic')
+    def test_ttl_expiry(self, patched_monotonic):
+        cache = TokenCache(maxsize=2, ttl=60)
+        patched_monotonic.return_value = 100
+        cache.set('a', 'token-a')
+
+        patched_monotonic.return_value = 159
+        self.assertEqual(cache.get('a'), 'token-a')
+        patched_monotonic.return_value = 161
+        self.assertIsNone(cache.get('a'))
+
+    def test_hit_miss_counters(self):
+        cache = TokenCache(maxsize=2, ttl=60)
+        cache.get('a')
+        cache.set('a', 'token-a')
+        cache.get('a')
+
+        self.assertEqual(cache.stats(), {'hits': 1, 'misses': 1, 'size': 1})
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    #Tests authenticating real requests with a token
+
+    def setUp(self):
+        token_cache.clear()
+        cache.clear()
+        self.user = get_user_model().objects.create_user('test@example.com', 'testpass123')
+        self.token = AuthToken.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_second_request_skips_token_query(self):
+        self.client.get(ME_URL)
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+        self.assertFalse([q for q in ctx.captured_queries if AuthToken._meta.db_table in q['sql']])
+        self.assertEqual(token_cache.stats()['hits'], 1)
+
+    def test_deleted_token_rejected(self):
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_on_other_worker_rejected(self):
+        self.client.get(ME_URL)
+        stale = token_cache.get(self.token.key)
+        self.user.is_active = False
+        self.user.save()
+        #this worker still holds the token from before the save
+        token_cache.set(self.token.key, stale)
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_cached_again_after_revocation(self):
+        self.client.get(ME_URL)
+        self.user.save() #revokes the cached token, the next request reads it from the db again
+        self.client.get(ME_URL)
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertFalse([q for q in ctx.captured_queries if AuthToken._meta.db_table in q['sql']])
+
+    def test_deactivated_user_rejected(self):
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_invalid_token_rejected(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token notarealtoken')
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,123 @@
+import asyncio
+import threading
+from contextvars import ContextVar
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.http import HttpResponse
+from django.test import TestCase, SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from user import hashers
+from user.hashers import Argon2PasswordHasher, PBKDF2PasswordHasher
+
+TOKEN_URL = reverse('user:token')
+
+#The real hashers, the test runner replaces them with MD5. Cheap work factors keep these tests quick.
+REAL_HASHERS = override_settings(PASSWORD_HASHERS=[
+    'user.hashers.Argon2PasswordHasher',
+    'user.hashers.PBKDF2PasswordHasher',
+])
+CHEAP_ARGON2 = patch.multiple(Argon2PasswordHasher, time_cost=1, memory_cost=256, parallelism=1)
+
+
+class TestRunnerHasherTests(TestCase):
+
+    def test_tests_use_fast_hasher(self):
+        user = get_user_model().objects.create_user('test@example.com', 'testpass123')
+        self.assertTrue(user.password.startswith('md5$'))
+
+
+@REAL_HASHERS
+@CHEAP_ARGON2
+class RehashOnLoginTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('test@example.com', 'testpass123')
+
+    def login(self):
+        res = self.client.post(TOKEN_URL, {'email': 'test@example.com', 'password': 'testpass123'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+
+    def test_new_passwords_use_argon2(self):
+        self.assertTrue(self.user.password.startswith('argon2$'))
+        self.assertTrue(self.user.check_password('testpass123'))
+
+    def test_pbkdf2_password_upgraded_on_login(self):
+        with patch.object(PBKDF2PasswordHasher, 'iterations', 1000):
+            self.user.password = make_password('testpass123', hasher='pbkdf2_sha256')
+        self.user.save()
+
+        self.login()
+
+        self.assertTrue(self.user.password.startswith('argon2$'))
+
+    def test_changed_work_factor_rehashed_on_login(self):
+        with patch.object(Argon2PasswordHasher, 'time_cost', 2):
+            self.user.set_password('testpass123')
+            self.user.save()
+
+        self.login()
+
+        #stored with the current time_cost (1) again
+        self.assertIn('t=1,', self.user.password)
+
+    def test_wrong_password_not_rehashed(self):
+        old_hash = self.user.password
+        res = self.client.post(TOKEN_URL, {'email': 'test@example.com', 'password': 'wrong'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.password, old_hash)
+
+
+class ConcurrencyLimitTests(SimpleTestCase):
+
+    def test_verify_calling_encode_does_not_deadlock(self):
+        #pbkdf2 verify() hashes again through encode(), both take a slot
+        with patch.object(hashers, '_limit', threading.BoundedSemaphore(1)), \
+                patch.object(PBKDF2PasswordHasher, 'iterations', 1000):
+            hasher = PBKDF2PasswordHasher()
+            encoded = hasher.encode('testpass123', hasher.salt())
+            self.assertTrue(hasher.verify('testpass123', encoded))
+
+    def test_slot_released(self):
+        limit = threading.BoundedSemaphore(1)
+        with patch.object(hashers, '_limit', limit):
+            with hashers.bounded():
+                self.assertFalse(limit.acquire(blocking=False))
+            self.assertTrue(limit.acquire(blocking=False))
+
+
+request_id = ContextVar('request_id', default=None)
+
+
+def thread_view(request):
+    return HttpResponse(f'{threading.current_thread().name} {request_id.get()}')
+
+
+class OffloadHashingTests(SimpleTestCase):
+    #Under ASGI login/signup run in the hashing pool instead of the worker's one shared sync thread
+
+    @override_settings(PASSWORD_HASH_OFFLOAD=False)
+    def test_view_unchanged_without_offload(self):
+        self.assertIs(hashers.offload_hashing(thread_view), thread_view)
+
+    @override_settings(PASSWORD_HASH_OFFLOAD=True)
+    def test_view_runs_in_hashing_pool(self):
+        async_view = hashers.offload_hashing(thread_view)
+        self.assertTrue(asyncio.iscoroutinefunction(async_view))
+
+        async def call():
+            request_id.set('abc') #context, e.g. instrumentation, carries over into the pool thread
+            return await async_view(None)
+
+        response = asyncio.run(call())
+
+        thread_name, value = response.content.decode().split()
+        self.assertTrue(thread_name.startswith('password-hashing'))
+        self.assertEqual(value, 'abc')
@@ -0,0 +1,136 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import AuthToken
+from user.authentication import token_cache
+
+TOKEN_URL = reverse('user:token')
+ROTATE_URL = reverse('user:token-rotate')
+ME_URL = reverse('user:me')
+
+
+class TokenIssueTests(TestCase):
+    #Tests for logging in with expiring tokens
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('test@example.com', 'testpass123')
+
+    def login(self):
+        res = self.client.post(TOKEN_URL, {'email': 'test@example.com', 'password': 'testpass123'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_token_has_expiry(self):
+        data = self.login()
+
+        token = AuthToken.objects.get(key=data['token'])
+        self.assertEqual(token.user, self.user)
+        self.assertIn('expires', data)
+        self.assertAlmostEqual(
+            token.expires, timezone.now() + timedelta(seconds=settings.TOKEN_TTL), delta=timedelta(minutes=1),
+        )
+
+    def test_login_again_returns_same_token(self):
+        first = self.login()
+        second = self.login()
+
+        self.assertEqual(first['token'], second['token'])
+        self.assertEqual(AuthToken.objects.filter(user=self.user).count(), 1)
+
+    def test_login_near_expiry_issues_new_token(self):
+        old = AuthToken.objects.create(
+            user=self.user, expires=timezone.now() + timedelta(seconds=settings.TOKEN_ROTATE_BEFORE - 60),
+        )
+
+        data = self.login()
+
+        self.assertNotEqual(data['token'], old.key)
+        #the old token keeps working until it expires
+        self.assertTrue(AuthToken.objects.filter(key=old.key).exists())
+
+
+class TokenAuthenticationTests(TestCase):
+    #Tests for expiry and rotation of the token in use
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user('test@example.com', 'testpass123')
+        self.token = AuthToken.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_expired_token_rejected(self):
+        AuthToken.objects.filter(key=self.token.key).update(expires=timezone.now() - timedelta(seconds=1))
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_cached_token_expiry_checked_without_query(self):
+        self.client.get(ME_URL)
+        #expire it in the cached copy only
+        token_cache.get(self.token.key).expires = timezone.now() - timedelta(seconds=1)
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_rotate(self):
+        self.client.get(ME_URL) #cache the old token
+
+        res = self.client.post(ROTATE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res.data['token'], self.token.key)
+        self.assertFalse(AuthToken.objects.filter(key=self.token.key).exists())
+        #the old token stops working right away, the new one works
+        self.assertEqual(self.client.get(ME_URL).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {res.data["token"]}')
+        self.assertEqual(self.client.get(ME_URL).status_code, status.HTTP_200_OK)
+
+    def test_rotate_seen_by_other_workers(self):
+        self.client.get(ME_URL)
+        stale = token_cache.get(self.token.key)
+
+        res = self.client.post(ROTATE_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        #another worker still holds the old token in its own token_cache
+        token_cache.set(self.token.key, stale)
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_rotate_requires_auth(self):
+        res = APIClient().post(ROTATE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PurgeTokensCommandTests(TestCase):
+
+    def test_deletes_expired_only(self):
+        user = get_user_model().objects.create_user('test@example.com', 'testpass123')
+        expired = timezone.now() - timedelta(days=1)
+        for _ in range(5):
+            AuthToken.objects.create(user=user, expires=expired)
+        valid = AuthToken.objects.create(user=user)
+
+        out = StringIO()
+        call_command('purge_tokens', batch_size=2, stdout=out)
+
+        self.assertEqual(list(AuthToken.objects.all()), [valid])
+        self.assertIn('Deleted 5 expired tokens', out.getvalue())
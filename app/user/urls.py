@@ -1,14 +1,17 @@
 from django.urls import path
 from user import views
+from user.hashers import offload_hashing
 
 #user/create -> register new user
-#user/token -> create a new token
+#user/token -> create a new token (or return the current one)
+#user/token/rotate -> replace the token used for the request
 #user/me -> update profile, OR view profile
 
 app_name = 'user'
 
 urlpatterns = [
-    path('create/', views.CreateUserView.as_view(), name='create'),
-    path('token/', views.CreateTokenView.as_view(), name='token' ),
+    path('create/', offload_hashing(views.CreateUserView.as_view()), name='create'),
+    path('token/', offload_hashing(views.CreateTokenView.as_view()), name='token' ),
+    path('token/rotate/', views.RotateTokenView.as_view(), name='token-rotate'),
     path('me/', views.ManageUserView.as_view(), name='me' ),
 ]
@@ -1,7 +1,11 @@
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
-from user.serializers import UserSerializer, AuthTokenSerializer
+from rest_framework.views import APIView
+from core.models import AuthToken
+from user.serializers import UserSerializer, AuthTokenSerializer, TokenSerializer
+from user.authentication import CachedTokenAuthentication
 
 class CreateUserView(generics.CreateAPIView):
     serializer_class = UserSerializer
@@ -10,11 +14,28 @@ class CreateTokenView(ObtainAuthToken):
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES #optional
 
+    def post(self, request, *args, **kwargs):
+        #Logging in again returns the same token until it gets close to expiring (AuthTokenManager.issue)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        token = AuthToken.objects.issue(serializer.validated_data['user'])
+        return Response(TokenSerializer(token).data)
+
+class RotateTokenView(APIView):
+    #Swap the token used for this request for a new one, the old one stops working (see AuthTokenManager.rotate)
+    serializer_class = TokenSerializer
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        token = AuthToken.objects.rotate(request.auth)
+        return Response(TokenSerializer(token).data)
+
 class ManageUserView(generics.RetrieveUpdateAPIView): #view given by rest framework lib to provide functionality for retrieving and updating data in the database
 
     #Manage the authenticated user
     serializer_class = UserSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self): #overrides typical behavior (gets object for HTTP get_request() or any other requests made to the api) returns user instead
@@ -0,0 +1,121 @@
+"""
+Small HTTP load test for comparing serving modes (stdlib only, run it from the host, not the app container).
+
+    SERVER_MODE=gthread docker-compose -f docker-compose-deploy.yml up -d
+    python scripts/load_test.py --url http://localhost --label gthread
+    SERVER_MODE=sync docker-compose -f docker-compose-deploy.yml up -d
+    python scripts/load_test.py --url http://localhost --label sync
+
+Creates (or reuses) a load test user, seeds a few recipes through the API, then hits the recipe list,
+recipe detail and token endpoints from --concurrency threads for --duration seconds each.
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+
+
+def call(base_url, method, path, data=None, token=None):
+    body = json.dumps(data).encode() if data is not None else None
+    request = urllib.request.Request(base_url + path, data=body, method=method)
+    request.add_header('Content-Type', 'application/json')
+    request.add_header('Accept-Encoding', 'gzip')
+    if token:
+        request.add_header('Authorization', f'Token {token}')
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as error:
+        return error.code, error.read()
+
+
+def setup(base_url, email, password, recipes):
+    call(base_url, 'POST', '/api/user/create/', {'email': email, 'password': password, 'name': 'Load Test'})
+    status, body = call(base_url, 'POST', '/api/user/token/', {'email': email, 'password': password})
+    if status != 200:
+        raise SystemExit(f'Could not get a token ({status}): {body[:200]!r}')
+    token = json.loads(body)['token']
+
+    status, body = call(base_url, 'GET', '/api/recipe/recipes/', token=token)
+    existing = json.loads(body) if status == 200 else []
+    for n in range(len(existing), recipes):
+        call(base_url, 'POST', '/api/recipe/recipes/', {
+            'title': f'Load test recipe {n}',
+            'time_minutes': n % 60 + 1,
+            'price': '5.50',
+            'description': 'Whisk the eggs with the sugar, fold in the flour and bake until golden. ' * 3,
+            'tags': [{'name': f'tag{n % 10}'}],
+            'ingredients': [{'name': f'ingredient{n % 20}'}, {'name': f'ingredient{(n + 1) % 20}'}],
+        }, token=token)
+
+    status, body = call(base_url, 'GET', '/api/recipe/recipes/', token=token)
+    return token, json.loads(body)[0]['id']
+
+
+def run(func, concurrency, duration):
+    latencies, errors = [], []
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker():
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            status = func()
+            elapsed = time.perf_counter() - start
+            with lock:
+                (latencies if status < 400 else errors).append(elapsed)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--label', default='', help='Printed with the results, e.g. the SERVER_MODE under test.')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--recipes', type=int, default=50)
+    parser.add_argument('--email', default='loadtest@example.com')
+    parser.add_argument('--password', default='loadtest-pass-123')
+    args = parser.parse_args()
+
+    base_url = args.url.rstrip('/')
+    token, recipe_id = setup(base_url, args.email, args.password, args.recipes)
+    credentials = {'email': args.email, 'password': args.password}
+    scenarios = [
+        ('recipe list', lambda: call(base_url, 'GET', '/api/recipe/recipes/', token=token)[0]),
+        ('recipe detail', lambda: call(base_url, 'GET', f'/api/recipe/recipes/{recipe_id}/', token=token)[0]),
+        ('token', lambda: call(base_url, 'POST', '/api/user/token/', credentials)[0]),
+    ]
+
+    print(f'{args.label or base_url}: {args.concurrency} clients, {args.duration:g}s per endpoint')
+    for name, func in scenarios:
+        latencies, errors = run(func, args.concurrency, args.duration)
+        if not latencies:
+            print(f'  {name:>14}: no successful requests ({len(errors)} errors)')
+            continue
+        print(
+            f'  {name:>14}: {len(latencies) / args.duration:8.1f} req/s'
+            f'  p50 {percentile(latencies, 50) * 1000:7.1f}ms'
+            f'  p95 {percentile(latencies, 95) * 1000:7.1f}ms'
+            f'  p99 {percentile(latencies, 99) * 1000:7.1f}ms'
+            f'  mean {statistics.mean(latencies) * 1000:7.1f}ms'
+            f'  errors {len(errors)}'
+        )
+
+
+if __name__ == '__main__':
+    main()